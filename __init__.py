@@ -22,10 +22,30 @@ __version__ = "0.2"
 # --------------------------------------------------------------------------- #
 # Import libraries
 # --------------------------------------------------------------------------- #
+import array
+import bisect
+import collections
+import collections.abc
+import contextlib
+import itertools
 import logging
+import math
+import mmap
+import numbers
+import tempfile
+import time
+import types
 
 from PyQt5 import QtWidgets, QtGui, QtCore
 from PyQt5.QtCore import Qt, QModelIndex
+try:
+    from PyQt5 import sip
+except ImportError:  # PyQt5 < 5.11 uses a separate sip module
+    import sip
+try:
+    import numpy
+except ImportError:  # numpy is optional, see QScalingLayout.setVectorized
+    numpy = None
 
 
 # --------------------------------------------------------------------------- #
@@ -34,6 +54,9 @@ from PyQt5.QtCore import Qt, QModelIndex
 class QNotice(QtWidgets.QWidget):
     """Implements an interactive notice container widget.
     """
+    # emitted with the reference geometry once keyboard nudging has settled
+    noticeMoved = QtCore.pyqtSignal(QtCore.QRect)
+
     def __init__(self, widget, parent=None):
         QtWidgets.QWidget.__init__(self, parent=parent)
         self._widget = widget
@@ -41,6 +64,17 @@ class QNotice(QtWidgets.QWidget):
         self._fixedY = False
         self._fixedWidth = False
         self._fixedHeight = False
+        # key presses accumulate a delta of x, y, width and height, which
+        # is applied at most once per frame
+        self._nudge = [0, 0, 0, 0]
+        self._nudgetimer = QtCore.QTimer(self)
+        self._nudgetimer.setSingleShot(True)
+        self._nudgetimer.setInterval(16)
+        self._nudgetimer.timeout.connect(self.applyPendingNudge)
+        self._settletimer = QtCore.QTimer(self)
+        self._settletimer.setSingleShot(True)
+        self._settletimer.setInterval(200)
+        self._settletimer.timeout.connect(self._nudgeSettled)
         # create layout
         layout = QtWidgets.QVBoxLayout()
         layout.setContentsMargins(0, 0, 0, 0)
@@ -51,6 +85,19 @@ class QNotice(QtWidgets.QWidget):
         """Returns the widget of this notice."""
         return self._widget
 
+    def setWidget(self, widget):
+        """Replaces the widget of this notice, which allows to reuse it.
+
+        The previous widget is removed from the gui but not deleted.
+        """
+        layout = self.layout()
+        if self._widget is not None:
+            layout.removeWidget(self._widget)
+            self._widget.setParent(None)
+        self._widget = widget
+        if widget is not None:
+            layout.addWidget(widget)
+
     def fixedX(self):
         return self._fixedX
     def setFixedX(self, val):
@@ -93,13 +140,69 @@ class QNotice(QtWidgets.QWidget):
         """Return the notice id."""
         return id(self._widget)
 
+    def hasPendingNudge(self):
+        """Returns True if key presses have not been applied yet."""
+        return self._nudge != [0, 0, 0, 0]
+
+    def applyPendingNudge(self):
+        """Applies the geometry change of pending key presses right away."""
+        self._nudgetimer.stop()
+        if not self.hasPendingNudge():
+            return
+        board = self.parent()
+        if board is None:
+            self.discardPendingNudge()
+            return
+        geom = self.refGeometry().getRect()
+        geom = [value + delta for value, delta in zip(geom, self._nudge)]
+        self._nudge = [0, 0, 0, 0]
+        self.setRefGeometry(QtCore.QRect(*geom))
+        self._settletimer.start()
+
+    def discardPendingNudge(self):
+        """Drops pending key presses without applying them."""
+        self._nudge = [0, 0, 0, 0]
+        self._nudgetimer.stop()
+        self._settletimer.stop()
+
+    def resetState(self):
+        """Restores the state of a new notice, so it can be reused.
+
+        Pending nudges are dropped and all slots connected to noticeMoved
+        are disconnected, since they belong to the previous content.
+        """
+        self.discardPendingNudge()
+        try:
+            self.noticeMoved.disconnect()
+        except TypeError:
+            pass  # nothing was connected
+        self.setFixedGeometry(False)
+        self.setEnabled(True)
+        self.setToolTip("")
+        self.setStatusTip("")
+        self.setWhatsThis("")
+        self.setObjectName("")
+        self.setStyleSheet("")
+        self.setGraphicsEffect(None)
+        self.unsetCursor()
+        self.setFocusPolicy(Qt.NoFocus)
+        self.setMinimumSize(0, 0)
+        self.setMaximumSize(QtWidgets.QWIDGETSIZE_MAX,
+                            QtWidgets.QWIDGETSIZE_MAX)
+
+    def _nudgeSettled(self):
+        if self.parent() is not None:
+            self.noticeMoved.emit(self.refGeometry())
+
     def mousePressEvent(self, event):
         if event.button() == Qt.LeftButton:
             self.setFocus()
         event.ignore()
 
     def keyPressEvent(self, event):
-        geom = list(self.refGeometry().getRect())
+        # the deltas are collected and applied by applyPendingNudge, so
+        # auto-repeated keys do not trigger a relayout each
+        geom = self._nudge
         if event.modifiers() & Qt.ShiftModifier:
             step = 10  # this should be an even number (2, 4, 6, ...)
         else:
@@ -120,8 +223,8 @@ class QNotice(QtWidgets.QWidget):
                 geom[1] -= int(step / 2)
             else:
                 resize = False
-            if resize is True:
-                self.setRefGeometry(QtCore.QRect(*geom))
+            if resize is True and not self._nudgetimer.isActive():
+                self._nudgetimer.start()
         else:  # move notice
             move = True
             if (self._fixedWidth is False and
@@ -138,8 +241,8 @@ class QNotice(QtWidgets.QWidget):
                 geom[1] += step
             else:
                 move = False
-            if move is True:
-                self.setRefGeometry(QtCore.QRect(*geom))
+            if move is True and not self._nudgetimer.isActive():
+                self._nudgetimer.start()
 
 
 class QScalingNoticeBoard(QtWidgets.QWidget):
@@ -148,6 +251,16 @@ class QScalingNoticeBoard(QtWidgets.QWidget):
     def __init__(self, referencewidth=400, referenceheight=300, parent=None):
         QtWidgets.QWidget.__init__(self, parent=parent)
         self.notices = {}
+        self._suspended = 0  # nesting depth of updatesSuspended
+        # removed notices are kept for reuse, see _acquireNotice
+        self._pool = []
+        self._poolsize = 64
+        self._poolhits = 0
+        self._poolmisses = 0
+        # lightweight notices are painted on a canvas, see addRecord
+        self.canvas = None  # a QNoticeCanvas, created for the first record
+        self._editing = {}  # maps notices to the records they edit
+        self._focusconnected = False
         self.background = QPixmapLabel()
 #        self.background.setGeometry(0, 0, referencewidth, referenceheight)
         # create layout
@@ -158,6 +271,20 @@ class QScalingNoticeBoard(QtWidgets.QWidget):
         pixmap = QtGui.QPixmap(referencewidth, referenceheight)
         pixmap.fill(Qt.transparent)
         self.setPixmap(pixmap)
+        self.background.imageLoaded.connect(self._backgroundLoaded)
+
+    def _replaceBackground(self, widget):
+        """Replaces the background widget and keeps it below all notices."""
+        layout = self.layout()
+        layout.removeWidget(self.background)
+        self.background.setParent(None)
+        self.background = widget
+        width, height = self.referenceSize()
+        widget.setGeometry(0, 0, width, height)
+        layout.addWidget(widget)
+        widget.lower()
+        if isinstance(widget, QPixmapLabel):
+            widget.imageLoaded.connect(self._backgroundLoaded)
 
     def referenceSize(self):
         """Return the reference size, which is used to calculate the scale."""
@@ -170,9 +297,16 @@ class QScalingNoticeBoard(QtWidgets.QWidget):
         layout.setReferenceSize(width, height)
         self.background.setGeometry(0, 0, width, height)
         layout.addWidget(self.background)
+        if self.canvas is not None:
+            layout.removeWidget(self.canvas)
+            self.canvas.setReferenceSize(width, height)
+            self.canvas.setGeometry(0, 0, width, height)
+            layout.addWidget(self.canvas)
 
     def setPixmap(self, pixmap):
         """Changes the background of the widget to pixmap."""
+        if not isinstance(self.background, QPixmapLabel):
+            self._replaceBackground(QPixmapLabel())
         referencewidth = pixmap.width()
         referenceheight = pixmap.height()
         # update reference size
@@ -188,19 +322,101 @@ class QScalingNoticeBoard(QtWidgets.QWidget):
 #        layout.addWidget(self.background)
 #        self.setLayout(layout)
 
+    def setImageSource(self, source):
+        """Loads the background from a file path or image data bytes.
+
+        The image is decoded on a worker thread, the reference size is
+        updated once it has been set on the background.
+        """
+        if not isinstance(self.background, QPixmapLabel):
+            self._replaceBackground(QPixmapLabel())
+        self.background.setImageSource(source)
+
+    def setTiledImageFile(self, path, tilesize=256, maxbytes=64 * 2**20):
+        """Displays a large image file as tiled background.
+
+        Only the tiles that are visible at the current scale are decoded,
+        see QTiledImageLabel. The reference size is set to the image size.
+        """
+        background = QTiledImageLabel(tilesize, maxbytes)
+        background.setImageFile(path)
+        self._setTiledBackground(background)
+
+    def setTiledRawImageFile(self, path, width, height,
+                             imageformat=QtGui.QImage.Format_ARGB32,
+                             offset=0, bytesperline=None, tilesize=256,
+                             maxbytes=64 * 2**20):
+        """Displays a memory-mapped file of raw pixels as tiled background.
+
+        See QTiledImageLabel.setRawImageFile for the arguments.
+        """
+        background = QTiledImageLabel(tilesize, maxbytes)
+        background.setRawImageFile(path, width, height, imageformat,
+                                   offset, bytesperline)
+        self._setTiledBackground(background)
+
+    def _setTiledBackground(self, background):
+        self._replaceBackground(background)
+        size = background.imageSize()
+        self.setReferenceSize(size.width(), size.height())
+
+    def _backgroundLoaded(self):
+        """Updates the reference size to a newly loaded background."""
+        pixmap = self.background.source
+        self.setReferenceSize(pixmap.width(), pixmap.height())
+
     def sizeHint(self):
         return self.layout().sizeHint()
 
     def minimumSizeHint(self):
         return self.background.minimumSizeHint()
 
-    def clear(self):
-        """Remove all notices from this board."""
+    def culling(self):
+        """True if notices outside of the visible area are hidden."""
+        return self.layout().culling()
+
+    def setCulling(self, val):
+        """Only position and show the notices in the visible area.
+
+        Useful when the board is zoomed in or placed in a QScrollArea.
+        See QScalingLayout.setCulling.
+        """
+        self.layout().setCulling(val)
+
+    def moveEvent(self, event):
+        QtWidgets.QWidget.moveEvent(self, event)
+        # scrolling moves the board within its viewport
+        self.layout().updateCulling()
+
+    @contextlib.contextmanager
+    def updatesSuspended(self):
+        """A context manager that defers layout passes and repaints.
+
+        The layout is disabled inside the block, so neither adding nor
+        removing notices nor changing their reference geometries triggers
+        a layout pass. Exactly one pass runs when the outermost block ends.
+        """
         layout = self.layout()
-        for notice in self.notices.values():
-            layout.removeWidget(notice)
-            notice.setParent(None)
-        self.notices = {}
+        if self._suspended == 0:
+            layout.setEnabled(False)
+            self.setUpdatesEnabled(False)
+        self._suspended += 1
+        try:
+            yield
+        finally:
+            self._suspended -= 1
+            if self._suspended == 0:
+                layout.setEnabled(True)
+                self.setUpdatesEnabled(True)
+                layout.invalidate()
+                layout.activate()
+
+    def clear(self):
+        """Remove all notices and records from this board."""
+        self._editing = {}
+        self.removeNotices(list(self.notices))
+        if self.canvas is not None:
+            self.canvas.clear()
 
     def notice(self, nid):
         """Returns the notice with the specified widget id."""
@@ -210,15 +426,99 @@ class QScalingNoticeBoard(QtWidgets.QWidget):
         """Returns a list of the widgets of all notices."""
         return [notice.widget() for notice in self.notices.values()]
 
+    def noticesAt(self, point):
+        """Returns the notices whose reference geometry contains point.
+
+        The point is in reference coordinates, widget coordinates can be
+        translated with self.layout().widgetToReference.
+        """
+        return [widget for widget in self.layout().widgetsAt(point)
+                if isinstance(widget, QNotice)]
+
+    def noticesIn(self, rect):
+        """Returns the notices whose reference geometry intersects rect.
+
+        The rect is in reference coordinates.
+        """
+        return [widget for widget in self.layout().widgetsIn(rect)
+                if isinstance(widget, QNotice)]
+
+    def noticePoolSize(self):
+        """The maximum number of removed notices kept for reuse."""
+        return self._poolsize
+
+    def setNoticePoolSize(self, val):
+        if val < 0:
+            raise ValueError("pool size must not be negative")
+        self._poolsize = val
+        while len(self._pool) > val:
+            self._pool.pop().deleteLater()
+
+    def noticePoolStats(self):
+        """Returns a dict with the hits, misses and count of the pool."""
+        return {"hits": self._poolhits, "misses": self._poolmisses,
+                "count": len(self._pool)}
+
+    def _acquireNotice(self, widget):
+        """Returns a pooled or new notice for widget."""
+        if self._pool:
+            self._poolhits += 1
+            notice = self._pool.pop()
+            notice.setWidget(widget)
+        else:
+            self._poolmisses += 1
+            notice = QNotice(widget)
+        notice.setGeometry(widget.geometry())
+        return notice
+
+    def _releaseNotice(self, notice):
+        """Removes a notice from the gui and keeps it for reuse.
+
+        The notice must have been removed from the layout already. Its
+        widget is detached, so the widget stays usable.
+        """
+        record = self._editing.pop(notice, None)
+        if record is not None:
+            # the notice of an edited record is removed, show the record
+            self.canvas.setRecordHidden(record, False)
+        notice.setParent(None)
+        notice.setWidget(None)
+        if len(self._pool) < self._poolsize:
+            notice.resetState()
+            self._pool.append(notice)
+        else:
+            notice.discardPendingNudge()
+            notice.deleteLater()
+
     def addNotice(self, widget):
         """Anchors the widget at the given widget coords and resizes it."""
         log.debug("Add notice %s", widget)
-        notice = QNotice(widget)
-        notice.setGeometry(widget.geometry())
+        notice = self._acquireNotice(widget)
         self.notices[id(widget)] = notice
         self.layout().addWidget(notice)
         return notice
 
+    def addNotices(self, widgets):
+        """Adds a notice for each widget and returns the list of notices.
+
+        All notices are registered with the layout before a single layout
+        pass positions them.
+        """
+        layout = self.layout()
+        notices = []
+        with self.updatesSuspended():
+            for widget in widgets:
+                notice = self._acquireNotice(widget)
+                self.notices[id(widget)] = notice
+                layout.addWidget(notice)
+                notices.append(notice)
+            if self.isVisible():
+                # show them while the layout is disabled, otherwise the
+                # deferred show of each notice activates the layout again
+                for notice in notices:
+                    notice.show()
+        return notices
+
     def removeNotice(self, nid):
         """Removes the notice with the specified widget id."""
         # remove notice from notices dict
@@ -227,7 +527,297 @@ class QScalingNoticeBoard(QtWidgets.QWidget):
         layout = self.layout()
         layout.removeWidget(notice)
         # remove it from the gui
-        notice.setParent(None)
+        self._releaseNotice(notice)
+
+    def removeNotices(self, nids):
+        """Removes the notices with the specified widget ids at once.
+
+        Raises KeyError without removing any notice if an id is unknown or
+        given more than once.
+        """
+        nids = list(nids)
+        notices = [self.notices[nid] for nid in nids]
+        if len(set(nids)) != len(nids):
+            duplicates = [nid for nid, count in
+                          collections.Counter(nids).items() if count > 1]
+            raise KeyError("Notice ids given more than once: %s"
+                           % duplicates)
+        for nid in nids:
+            del self.notices[nid]
+        with self.updatesSuspended():
+            # remove them from the layout list in a single pass
+            self.layout().removeWidgets(notices)
+            # remove them from the gui, the disabled layout does not
+            # look for them in its items again
+            for notice in notices:
+                self._releaseNotice(notice)
+
+    def _ensureCanvas(self):
+        """Creates the canvas for records, which covers the reference rect."""
+        if self.canvas is not None:
+            return self.canvas
+        width, height = self.referenceSize()
+        self.canvas = QNoticeCanvas(width, height)
+        self.canvas.setGeometry(0, 0, width, height)
+        self.layout().addWidget(self.canvas)
+        # stack the canvas above the background but below all notices
+        self.canvas.lower()
+        self.background.lower()
+        self.canvas.recordClicked.connect(self.editRecord)
+        return self.canvas
+
+    def records(self):
+        """Returns a list of all records of this board."""
+        if self.canvas is None:
+            return []
+        return list(self.canvas.records)
+
+    def addRecord(self, record):
+        """Adds a QNoticeRecord, which is painted instead of being a widget.
+
+        Records are much cheaper than notices, which makes boards with
+        tens of thousands of them feasible. A record is turned into a
+        notice while it is edited, see editRecord.
+        """
+        self._ensureCanvas().addRecords([record])
+        return record
+
+    def addRecords(self, records):
+        """Adds several records with a single repaint."""
+        records = list(records)
+        self._ensureCanvas().addRecords(records)
+        return records
+
+    def removeRecord(self, record):
+        """Removes a record from this board."""
+        if self.canvas is None:
+            return
+        for notice, edited in list(self._editing.items()):
+            if edited is record:
+                self.removeNotice(notice.nid())
+        self.canvas.removeRecord(record)
+
+    def updateRecord(self, record):
+        """Repaints a record after its geometry or content have changed."""
+        if self.canvas is None:
+            return
+        self.canvas.updateRecord(record)
+
+    def recordsAt(self, point):
+        """Returns the records at point in reference coordinates, the
+        topmost first."""
+        if self.canvas is None:
+            return []
+        return self.canvas.recordsAt(point)
+
+    def recordsIn(self, rect):
+        """Returns the records intersecting rect in reference coordinates."""
+        if self.canvas is None:
+            return []
+        return self.canvas.recordsIn(rect)
+
+    def createRecordWidget(self, record):
+        """Returns a new widget that displays record while it is edited.
+
+        Reimplement this to use custom editors.
+        """
+        if record.pixmap is not None or record.icon is not None:
+            widget = QPixmapLabel()
+            if record.pixmap is not None:
+                widget.setPixmap(record.pixmap)
+            else:
+                widget.setPixmap(record.icon.pixmap(record.geometry.size()))
+        else:
+            widget = QtWidgets.QLabel(record.text)
+            widget.setAlignment(Qt.AlignCenter)
+            widget.setWordWrap(True)
+        return widget
+
+    def editRecord(self, record):
+        """Turns a record into a notice with focus and returns the notice.
+
+        The notice keeps the keyboard move and resize behavior of QNotice.
+        Once it loses the focus, its reference geometry is written back to
+        the record, the notice is removed and the record is painted again.
+        """
+        for notice, edited in self._editing.items():
+            if edited is record:
+                return notice
+        if not self._focusconnected:
+            app = QtWidgets.QApplication.instance()
+            app.focusChanged.connect(self._focusChanged)
+            self._focusconnected = True
+        widget = self.createRecordWidget(record)
+        widget.setGeometry(record.geometry)
+        notice = self.addNotice(widget)
+        self._editing[notice] = record
+        self.canvas.setRecordHidden(record, True)
+        notice.setFocus()
+        return notice
+
+    def finishEditing(self, notice):
+        """Writes the geometry of notice back to its record and removes it."""
+        notice.applyPendingNudge()
+        record = self._editing.pop(notice)
+        record.geometry = QtCore.QRect(notice.refGeometry())
+        self.canvas.setRecordHidden(record, False)
+        self.canvas.updateRecord(record)
+        self.removeNotice(notice.nid())
+
+    def _focusChanged(self, old, now):
+        for notice in list(self._editing):
+            if now is None or not (now is notice or notice.isAncestorOf(now)):
+                self.finishEditing(notice)
+
+
+class QNoticeRecord(object):
+    """A lightweight notice, which is painted by its board.
+
+    A record has a reference geometry and simple content: text, an icon or
+    a pixmap. It is not a widget, see QScalingNoticeBoard.addRecord.
+    """
+    textflags = Qt.AlignCenter | Qt.TextWordWrap
+
+    def __init__(self, geometry, text="", icon=None, pixmap=None):
+        self.geometry = QtCore.QRect(geometry)  # in reference coordinates
+        self.text = text
+        self.icon = icon
+        self.pixmap = pixmap
+
+    def paint(self, painter):
+        """Paints the record with a painter in reference coordinates."""
+        rect = self.geometry
+        if self.pixmap is not None and not self.pixmap.isNull():
+            # fit the pixmap into the geometry, preserving aspect ratio
+            scale = calculateScale(self.pixmap.rect(), rect)[0]
+            width = self.pixmap.width() * scale
+            height = self.pixmap.height() * scale
+            target = QtCore.QRectF(rect.x() + (rect.width() - width) / 2,
+                                   rect.y() + (rect.height() - height) / 2,
+                                   width, height)
+            painter.drawPixmap(target, self.pixmap,
+                               QtCore.QRectF(self.pixmap.rect()))
+        elif self.icon is not None:
+            self.icon.paint(painter, rect)
+        if self.text:
+            painter.drawText(rect, self.textflags, self.text)
+
+
+class QNoticeCanvas(QtWidgets.QWidget):
+    """Paints the records of a notice board in a single pass.
+
+    The canvas covers the reference rect of the board, records are painted
+    in reference coordinates with the current scale applied. Only records
+    intersecting the exposed area are painted, found with a SpatialGrid.
+    """
+    # emitted with the topmost record under a left mouse button press
+    recordClicked = QtCore.pyqtSignal(object)
+
+    def __init__(self, referencewidth, referenceheight, parent=None):
+        QtWidgets.QWidget.__init__(self, parent=parent)
+        self.records = {}  # maps records to their stacking order
+        self.hidden = set()  # records that are not painted
+        self.grid = SpatialGrid()
+        self._order = 0
+        self._refsize = QtCore.QSize(referencewidth, referenceheight)
+
+    def setReferenceSize(self, width, height):
+        self._refsize = QtCore.QSize(width, height)
+        self.update()
+
+    def scale(self):
+        """Returns the horizontal and vertical scale of the canvas."""
+        return (self.width() / self._refsize.width(),
+                self.height() / self._refsize.height())
+
+    def mapToReference(self, point):
+        """Translates local widget coordinates to reference coordinates."""
+        xscale, yscale = self.scale()
+        return QtCore.QPoint(math.floor(point.x() / xscale),
+                             math.floor(point.y() / yscale))
+
+    def mapFromReference(self, rect):
+        """Translates a reference rect to a rect in widget coordinates."""
+        xscale, yscale = self.scale()
+        left = math.floor(rect.left() * xscale)
+        top = math.floor(rect.top() * yscale)
+        right = math.ceil((rect.left() + rect.width()) * xscale)
+        bottom = math.ceil((rect.top() + rect.height()) * yscale)
+        return QtCore.QRect(left, top, right - left, bottom - top)
+
+    def addRecords(self, records):
+        for record in records:
+            self._order += 1
+            self.records[record] = self._order
+            self.grid.set(record, record.geometry)
+        self.update()
+
+    def removeRecord(self, record):
+        del self.records[record]
+        self.hidden.discard(record)
+        self.grid.remove(record)
+        self.update(self.mapFromReference(record.geometry))
+
+    def updateRecord(self, record):
+        """Updates the index and repaints a record after it has changed."""
+        bounds = self.grid.rects.get(record)
+        if bounds is not None:
+            left, top, right, bottom = bounds
+            old = QtCore.QRect(left, top, right - left, bottom - top)
+            self.update(self.mapFromReference(old))
+        self.grid.set(record, record.geometry)
+        self.update(self.mapFromReference(record.geometry))
+
+    def setRecordHidden(self, record, val):
+        if val:
+            self.hidden.add(record)
+        else:
+            self.hidden.discard(record)
+        self.update(self.mapFromReference(record.geometry))
+
+    def clear(self):
+        self.records = {}
+        self.hidden = set()
+        self.grid = SpatialGrid()
+        self.update()
+
+    def recordsAt(self, point):
+        """Returns the visible records at the reference point, topmost
+        first."""
+        records = self.grid.queryPoint(point) - self.hidden
+        return sorted(records, key=self.records.get, reverse=True)
+
+    def recordsIn(self, rect):
+        """Returns the visible records intersecting the reference rect in
+        stacking order."""
+        records = self.grid.query(rect) - self.hidden
+        return sorted(records, key=self.records.get)
+
+    def paintEvent(self, event):
+        if not self.records:
+            return
+        xscale, yscale = self.scale()
+        exposed = event.rect()
+        left = math.floor(exposed.left() / xscale)
+        top = math.floor(exposed.top() / yscale)
+        right = math.ceil((exposed.left() + exposed.width()) / xscale)
+        bottom = math.ceil((exposed.top() + exposed.height()) / yscale)
+        records = self.recordsIn(QtCore.QRect(left, top, right - left,
+                                              bottom - top))
+        painter = QtGui.QPainter(self)
+        painter.setRenderHint(QtGui.QPainter.SmoothPixmapTransform)
+        painter.setRenderHint(QtGui.QPainter.TextAntialiasing)
+        painter.scale(xscale, yscale)
+        for record in records:
+            record.paint(painter)
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            records = self.recordsAt(self.mapToReference(event.pos()))
+            if records:
+                self.recordClicked.emit(records[0])
+                return
+        event.ignore()
 
 
 class QScalingLayout(QtWidgets.QLayout):
@@ -248,11 +838,29 @@ class QScalingLayout(QtWidgets.QLayout):
         self.currect = None  # a QtCore.QRect instance
         self.items = []
         self.itemgeom = {}  # stores the reference geometry of layout items
+        self.widgetitems = {}  # maps widgets to their layout items
+        # state for incremental relayouts, see setGeometry
+        self.itemrects = {}  # maps items to the geometry last applied
+        self._dirty = set()  # items whose reference geometry changed
+        self._hiddenitems = set()  # hidden items that were not positioned
+        self._layoutrect = None  # the rect of the last full layout pass
+        self._scale = 1.0
+        self._offset = (0, 0)
+        self.geomarray = None  # a GeometryArray, see setVectorized
+        self.grid = SpatialGrid()  # spatial index of the reference geometries
+        # state for culling items outside of the visible area
+        self._culling = False
+        self._inview = set()  # items in the visible area of the last pass
+        self._culled = set()  # items hidden because they are not visible
         self.setReferenceSize(referencewidth, referenceheight)
 
     def __del__(self):
         self.items = []
         self.itemgeom = {}
+        self.widgetitems = {}
+        self.itemrects = {}
+        self._dirty = set()
+        self._hiddenitems = set()
         # QtWidgets.QLayout.__del__(self)  # __del__ not implemented in QLayout
         # TODO maybe we also have to del each item separately
         # TODO or maybe this whole method is unnecessary
@@ -271,10 +879,73 @@ class QScalingLayout(QtWidgets.QLayout):
             return None
 
     def takeAt(self, idx):
-        return self.items.pop(idx)
+        item = self.items.pop(idx)
+        self._forgetItem(item)
+        return item
+
+    def _forgetItem(self, item):
+        """Removes all references to an item that left self.items."""
+        widget = item.widget()
+        # forget the item, so neither widget nor item are kept alive
+        self.itemgeom.pop(item, None)
+        self.itemrects.pop(item, None)
+        self._dirty.discard(item)
+        self._hiddenitems.discard(item)
+        if self.geomarray is not None:
+            self.geomarray.remove(item)
+        self.grid.remove(item)
+        self._inview.discard(item)
+        if item in self._culled:
+            self._culled.discard(item)
+            # undo the culling while the widget is still on our parent
+            if widget.parentWidget() is self.parentWidget():
+                widget.show()
+        if self.widgetitems.get(widget) is item:
+            del self.widgetitems[widget]
+
+    def invalidate(self):
+        # Qt invalidates the layout when a hidden widget is shown, so the
+        # hidden items are positioned with the next pass
+        self._dirty.update(self._hiddenitems)
+        self._hiddenitems.clear()
+        QtWidgets.QLayout.invalidate(self)
+
+    def indexOf(self, widget):
+        item = self.widgetitems.get(widget)
+        if item is None:
+            return -1
+        return self.items.index(item)
+
+    def removeWidget(self, widget):
+        """Removes widget from the layout, without scanning all items."""
+        item = self.widgetitems.get(widget)
+        if item is None:
+            return
+        self.takeAt(self.items.index(item))
+        # like QLayout.removeWidget, delete the item but not the widget
+        sip.delete(item)
+        self.invalidate()
+
+    def removeWidgets(self, widgets):
+        """Removes several widgets with a single pass over the items."""
+        removed = set()
+        for widget in widgets:
+            item = self.widgetitems.get(widget)
+            if item is not None:
+                removed.add(item)
+        if not removed:
+            return
+        self.items = [item for item in self.items if item not in removed]
+        for item in removed:
+            self._forgetItem(item)
+            sip.delete(item)
+        self.invalidate()
 
     def addItem(self, item):
         self.items.append(item)
+        self.widgetitems[item.widget()] = item
+        if self._culling:
+            self._inview.add(item)  # hide it with the next pass if needed
         if item.widget() != 0:
             # set the reference geometry for the widget
             # in this item to the item's geometry
@@ -283,6 +954,138 @@ class QScalingLayout(QtWidgets.QLayout):
             raise NotImplementedError
 
     def setGeometry(self, rect):
+        if self._layoutrect is not None and rect == self._layoutrect:
+            # scale and offset are unchanged, so only the items whose
+            # reference geometry changed have to be repositioned
+            items = list(self._dirty)
+        else:
+            self._updateScale(rect)
+            items = self.items
+        self._dirty.clear()
+        if self._culling:
+            # only position the items that can be seen
+            items = self._cull()
+        if items is self.items and self.geomarray is not None:
+            # calculate the geometries of all items in one batch
+            xoff, yoff = self._offset
+            geoms = self.geomarray.scaled(self._scale, xoff, yoff)
+            itemgeoms = zip(self.geomarray.items, geoms.tolist())
+        else:
+            itemgeoms = ((item, self.scaledGeometry(item)) for item in items)
+        itemrects = self.itemrects
+        # update item geometries
+        for item, newgeom in itemgeoms:
+            # update item geometry, unless it would not change
+            newgeom = tuple(newgeom)
+            if itemrects.get(item) != newgeom:
+                if item.isEmpty():
+                    # hidden widgets ignore their geometry, they are
+                    # positioned once showing them invalidates the layout
+                    self._hiddenitems.add(item)
+                    continue
+                itemrects[item] = newgeom
+                item.setGeometry(QtCore.QRect(*newgeom))
+
+    def culling(self):
+        """True if items outside of the visible area are hidden."""
+        return self._culling
+
+    def setCulling(self, val):
+        """Enables culling of the items outside of the visible area.
+
+        With culling, only the items that intersect the visible part of the
+        parent widget are positioned and shown, all others are hidden until
+        they come into view. The visible part is the parent widget clipped
+        by its ancestors, e.g. the viewport of a QScrollArea.
+        Call updateCulling when the visible part changes without a resize
+        of the parent widget.
+        """
+        self._culling = val
+        if val is True:
+            # assume everything is in view, so the first pass hides the rest
+            self._inview = set(self.items)
+        else:
+            for item in self._culled:
+                item.widget().show()
+            self._inview = set()
+            self._culled = set()
+        # relayout all items
+        self._layoutrect = None
+        self.update()
+
+    def updateCulling(self):
+        """Shows and positions the items that have come into view."""
+        if self._culling and self._layoutrect is not None:
+            self.setGeometry(self._layoutrect)
+
+    def visibleItems(self):
+        """Returns the set of items that intersect the visible area."""
+        visible = visibleRect(self.parentWidget())
+        if visible.isEmpty():
+            return set()
+        # translate the visible area to reference coordinates
+        scale = self._scale
+        xoff, yoff = self._offset
+        left = math.floor((visible.left() - xoff) / scale)
+        top = math.floor((visible.top() - yoff) / scale)
+        right = math.ceil((visible.left() + visible.width() - xoff) / scale)
+        bottom = math.ceil((visible.top() + visible.height() - yoff) / scale)
+        # grow it by a pixel to account for rounding of item geometries
+        return self.grid.query(QtCore.QRect(left - 1, top - 1,
+                                            right - left + 2,
+                                            bottom - top + 2))
+
+    def _cull(self):
+        """Hides the items that left the visible area, shows the items that
+        came into view and returns the visible items."""
+        visible = self.visibleItems()
+        for item in self._inview - visible:
+            widget = item.widget()
+            if not widget.isHidden():
+                widget.hide()
+                self._culled.add(item)
+        for item in visible - self._inview:
+            if item in self._culled:
+                self._culled.discard(item)
+                item.widget().show()
+        self._inview = visible
+        return visible
+
+    def scaledGeometry(self, item):
+        """Returns the geometry of item for the current scale as list."""
+        # retrieve reference item geometry
+        refgeom = self.itemgeom[item]
+        # calculate new item geometry
+        scale = self._scale
+        newgeom = [round(c * scale) for c in refgeom.getRect()]
+        # adjust for excess space
+        newgeom[0] = newgeom[0] + self._offset[0]
+        newgeom[1] = newgeom[1] + self._offset[1]
+        return newgeom
+
+    def vectorized(self):
+        """True if the reference geometries are also kept in a NumPy array."""
+        return self.geomarray is not None
+
+    def setVectorized(self, val):
+        """Enables batched geometry calculations with NumPy.
+
+        This pays off for layouts with thousands of items, where a full
+        layout pass and sizeHint are dominated by per-item Python code.
+        """
+        if val is False:
+            self.geomarray = None
+            return
+        if numpy is None:
+            raise ImportError("vectorized layouts require numpy")
+        if self.geomarray is None:
+            self.geomarray = GeometryArray(max(64, len(self.items)))
+            for item in self.items:
+                self.geomarray.set(item, self.itemgeom[item])
+
+    def _updateScale(self, rect):
+        """Calculates the scale and the item offset for a layout rect."""
+        self._layoutrect = QtCore.QRect(rect)
         # determine the scale of the new geometry and the limiting dimension
         scale, limdim = calculateScale(self.refrect, rect)
         # adjust the size of the current rect
@@ -295,27 +1098,24 @@ class QScalingLayout(QtWidgets.QLayout):
         else:
             xoff = round((rect.width() - self.currect.width()) / 2)
             yoff = 0
-        # update item geometries
-        for item in self.items:
-            # retrieve reference item geometry
-            refgeom = self.itemgeom[id(item)]
-            # calculate new item geometry
-            newgeom = [round(c * scale) for c in refgeom.getRect()]
-            # adjust for excess space
-            newgeom[0] = newgeom[0] + xoff
-            newgeom[1] = newgeom[1] + yoff
-            # TODO check if we need QLayoutItem.isEmpty to support hidden items
-            # update item geometry
-            item.setGeometry(QtCore.QRect(*newgeom))
+        self._scale = scale
+        self._offset = (xoff, yoff)
 
     def sizeHint(self):
+        if self.geomarray is not None and len(self.geomarray) > 0:
+            left, top, right, bottom = self.geomarray.bounds()
+            width = (max(right, self.refrect.left() + self.refrect.width()) -
+                     min(left, self.refrect.left()))
+            height = (max(bottom, self.refrect.top() + self.refrect.height()) -
+                      min(top, self.refrect.top()))
+            return QtCore.QSize(width, height)
         left = [self.refrect.left()]
         right = [self.refrect.left() + self.refrect.width()]
         top = [self.refrect.top()]
         bottom = [self.refrect.top() + self.refrect.height()]
         for item in self.items:
             # retrieve reference item geometry
-            refgeom = self.itemgeom[id(item)]
+            refgeom = self.itemgeom[item]
             left.append(refgeom.left())
             right.append(refgeom.left() + refgeom.width())
             top.append(refgeom.top())
@@ -338,11 +1138,15 @@ class QScalingLayout(QtWidgets.QLayout):
             raise ValueError("reference height must be bigger than 0")
         self.refrect = QtCore.QRect(0, 0, width, height)
         self.currect = QtCore.QRect(0, 0, width, height)
+        self._layoutrect = None  # the scale changes, relayout all items
 
     def referenceGeometry(self, notice):
         """Returns the reference geometry for this notice."""
-        item = self.itemAt(self.indexOf(notice))
-        return self.itemgeom[id(item)]
+        item = self.widgetitems.get(notice)
+        if item is None:
+            raise KeyError("Widget %s is not part of layout %s"
+                           % (notice, self))
+        return QtCore.QRect(self.itemgeom[item])
 
     def setReferenceGeometry(self, notice, geometry):
         """Sets the reference geometry for this notice."""
@@ -351,18 +1155,41 @@ class QScalingLayout(QtWidgets.QLayout):
             raise TypeError("geometry must be a QtCore.QRect, not %s"
                             % type(geometry))
         # fetch the layout item for this notice...
-        item = self.itemAt(self.indexOf(notice))
+        item = self.widgetitems.get(notice)
         # ...and raise an error if the layout does not find it
         if item is None:
             raise KeyError("Widget %s is not part of layout %s"
                            % (notice, self))
         # store the reference geometry for this notice
-        self.itemgeom[id(item)] = geometry
+        if self.itemgeom.get(item) == geometry:
+            return
+        # store a copy, so later changes to geometry are not missed
+        self.itemgeom[item] = QtCore.QRect(geometry)
+        self._dirty.add(item)
+        if self.geomarray is not None:
+            self.geomarray.set(item, geometry)
+        self.grid.set(item, geometry)
         # if this layout has been set on a widget, update this layout to
         # account for the new geometry of one of it's layout items
-        if self.parentWidget() is not None:
+        if self.parentWidget() is not None and self.isEnabled():
             self.update()
 
+    def widgetsAt(self, point):
+        """Returns the widgets whose reference geometry contains point.
+
+        The point is in reference coordinates, see widgetToReference. The
+        widgets are returned in no particular order.
+        """
+        return [item.widget() for item in self.grid.queryPoint(point)]
+
+    def widgetsIn(self, rect):
+        """Returns the widgets whose reference geometry intersects rect.
+
+        The rect is in reference coordinates. The widgets are returned in no
+        particular order.
+        """
+        return [item.widget() for item in self.grid.query(rect)]
+
     def widgetToReference(self, point):
         """Translates local widget coordinates to reference coordinates."""
         widget = self.parentWidget()
@@ -383,6 +1210,176 @@ class QScalingLayout(QtWidgets.QLayout):
         return self.currect.width() / self.refrect.width()
 
 
+class SpatialGrid(object):
+    """A uniform grid that indexes rectangles for region queries.
+
+    Every key is registered in each grid cell its rectangle overlaps.
+    Rectangles that would cover more than maxcells cells, like a board
+    background, are kept in a separate set that is checked by every query.
+    """
+    def __init__(self, cellsize=128, maxcells=256):
+        self.cellsize = cellsize
+        self.maxcells = maxcells
+        self.cells = {}  # maps (column, row) to a set of keys
+        self.rects = {}  # maps keys to (left, top, right, bottom)
+        self.large = set()  # keys of rectangles covering too many cells
+
+    def __len__(self):
+        return len(self.rects)
+
+    def __contains__(self, key):
+        return key in self.rects
+
+    def _cellRange(self, left, top, right, bottom):
+        """Returns the column and row ranges of the cells overlapping the
+        rectangle, which excludes right and bottom."""
+        size = self.cellsize
+        return (range(left // size, (right - 1) // size + 1),
+                range(top // size, (bottom - 1) // size + 1))
+
+    def set(self, key, rect):
+        """Adds key with the QRect rect or moves it to rect."""
+        self.remove(key)
+        left, top, width, height = rect.getRect()
+        bounds = (left, top, left + width, top + height)
+        self.rects[key] = bounds
+        if width <= 0 or height <= 0:
+            return  # empty rectangles can not intersect anything
+        columns, rows = self._cellRange(*bounds)
+        if len(columns) * len(rows) > self.maxcells:
+            self.large.add(key)
+            return
+        cells = self.cells
+        for column in columns:
+            for row in rows:
+                cell = cells.get((column, row))
+                if cell is None:
+                    cells[(column, row)] = cell = set()
+                cell.add(key)
+
+    def remove(self, key):
+        """Removes key, if it is part of the grid."""
+        bounds = self.rects.pop(key, None)
+        if bounds is None:
+            return
+        if key in self.large:
+            self.large.discard(key)
+            return
+        if bounds[2] <= bounds[0] or bounds[3] <= bounds[1]:
+            return
+        columns, rows = self._cellRange(*bounds)
+        cells = self.cells
+        for column in columns:
+            for row in rows:
+                cell = cells[(column, row)]
+                cell.discard(key)
+                if not cell:
+                    del cells[(column, row)]
+
+    def query(self, rect):
+        """Returns the set of keys whose rectangles intersect the QRect."""
+        left, top, width, height = rect.getRect()
+        if width <= 0 or height <= 0:
+            return set()
+        right = left + width
+        bottom = top + height
+        candidates = set(self.large)
+        columns, rows = self._cellRange(left, top, right, bottom)
+        cells = self.cells
+        if len(columns) * len(rows) > len(cells):
+            # the area is big, so scanning the occupied cells is faster
+            for (column, row), cell in cells.items():
+                if column in columns and row in rows:
+                    candidates.update(cell)
+        else:
+            for column in columns:
+                for row in rows:
+                    cell = cells.get((column, row))
+                    if cell is not None:
+                        candidates.update(cell)
+        rects = self.rects
+        result = set()
+        for key in candidates:
+            kleft, ktop, kright, kbottom = rects[key]
+            if (kleft < right and left < kright and
+                    ktop < bottom and top < kbottom):
+                result.add(key)
+        return result
+
+    def queryPoint(self, point):
+        """Returns the set of keys whose rectangles contain the QPoint."""
+        x = point.x()
+        y = point.y()
+        cell = self.cells.get((x // self.cellsize, y // self.cellsize), ())
+        result = set()
+        for key in self.large.union(cell):
+            left, top, right, bottom = self.rects[key]
+            if left <= x < right and top <= y < bottom:
+                result.add(key)
+        return result
+
+
+class GeometryArray(object):
+    """Stores the geometries of layout items as rows of a NumPy array.
+
+    Each row holds x, y, width and height of one item. Removing an item
+    moves the last row into its place, so adding and removing are O(1)
+    and the used rows stay contiguous.
+    """
+    def __init__(self, capacity=64):
+        self.array = numpy.zeros((capacity, 4), dtype=numpy.int64)
+        self.items = []  # maps row numbers to items
+        self.rows = {}  # maps items to row numbers
+
+    def __len__(self):
+        return len(self.items)
+
+    def set(self, item, rect):
+        """Adds item with geometry rect or updates its geometry."""
+        row = self.rows.get(item)
+        if row is None:
+            row = len(self.items)
+            if row == len(self.array):
+                # double the capacity
+                array = numpy.zeros((2 * row, 4), dtype=numpy.int64)
+                array[:row] = self.array
+                self.array = array
+            self.items.append(item)
+            self.rows[item] = row
+        self.array[row] = rect.getRect()
+
+    def remove(self, item):
+        """Removes item, if it is part of this array."""
+        row = self.rows.pop(item, None)
+        if row is None:
+            return
+        lastitem = self.items.pop()
+        if lastitem is not item:
+            # move the last row into the gap
+            last = len(self.items)
+            self.array[row] = self.array[last]
+            self.items[row] = lastitem
+            self.rows[lastitem] = row
+
+    def scaled(self, scale, xoff=0, yoff=0):
+        """Returns all geometries multiplied by scale and offset by xoff
+        and yoff as (N, 4) array, rounded like the built-in round."""
+        geoms = numpy.rint(self.array[:len(self.items)] * scale)
+        geoms = geoms.astype(numpy.int64)
+        geoms[:, 0] += xoff
+        geoms[:, 1] += yoff
+        return geoms
+
+    def bounds(self):
+        """Returns left, top, right and bottom of the bounding box."""
+        geoms = self.array[:len(self.items)]
+        left = int(geoms[:, 0].min())
+        top = int(geoms[:, 1].min())
+        right = int((geoms[:, 0] + geoms[:, 2]).max())
+        bottom = int((geoms[:, 1] + geoms[:, 3]).max())
+        return left, top, right, bottom
+
+
 class QIconPushButton(QtWidgets.QPushButton):
     """A push button displaying an icon that scales with button size.
     """
@@ -401,14 +1398,71 @@ class QIconPushButton(QtWidgets.QPushButton):
 
     def setIconPadding(self, val):
         self._icon_padding = val
+        self._updateIconSize()
 
-    def paintEvent(self, event):
-        QtWidgets.QPushButton.paintEvent(self, event)
+    def _updateIconSize(self):
         # fit icon into current widget size
         iconw = max(1, self.rect().width() - self._icon_padding)
         iconh = max(1, self.rect().height() - self._icon_padding)
         self.setIconSize(QtCore.QSize(iconw, iconh))
 
+    def iconPixmap(self, size, mode, state):
+        """Returns the icon rendered for size, mode and state.
+
+        Rendering a QIcon rasterizes it again, so the pixmaps are kept in
+        iconcache, which is shared by all buttons.
+        """
+        icon = self.icon()
+        key = (icon.cacheKey(), size.width(), size.height(),
+               self.devicePixelRatioF(), mode, state)
+        pixmap = iconcache.get(key)
+        if pixmap is None:
+            pixmap = icon.pixmap(size, mode, state)
+            iconcache.put(key, pixmap)
+        return pixmap
+
+    @staticmethod
+    def iconCacheStats():
+        """Returns hits, misses, count and bytes of the shared icon cache."""
+        return iconcache.stats()
+
+    @staticmethod
+    def iconCacheLimit():
+        """Returns the maximum number of bytes of the shared icon cache."""
+        return iconcache.maxBytes()
+
+    @staticmethod
+    def setIconCacheLimit(maxbytes):
+        """Sets the maximum number of bytes of the shared icon cache."""
+        iconcache.setMaxBytes(maxbytes)
+
+    def resizeEvent(self, event):
+        QtWidgets.QPushButton.resizeEvent(self, event)
+        self._updateIconSize()
+
+    def paintEvent(self, event):
+        # same as QPushButton.paintEvent, but with a cached icon pixmap
+        painter = QtWidgets.QStylePainter(self)
+        option = QtWidgets.QStyleOptionButton()
+        self.initStyleOption(option)
+        if not option.icon.isNull():
+            # use the mode and state the style would pick for the icon
+            if not option.state & QtWidgets.QStyle.State_Enabled:
+                mode = QtGui.QIcon.Disabled
+            elif option.state & QtWidgets.QStyle.State_HasFocus:
+                mode = QtGui.QIcon.Active
+            else:
+                mode = QtGui.QIcon.Normal
+            if option.state & QtWidgets.QStyle.State_On:
+                state = QtGui.QIcon.On
+            else:
+                state = QtGui.QIcon.Off
+            icon = QtGui.QIcon()
+            icon.addPixmap(self.iconPixmap(option.iconSize, mode, state),
+                           mode, state)
+            option.icon = icon
+        painter.drawControl(QtWidgets.QStyle.CE_PushButton, option)
+
     def sizeHint(self):
         btnsize = QtWidgets.QPushButton.sizeHint(self)
         iconsize = self.iconSize()
@@ -426,6 +1480,9 @@ class QPixmapLabel(QtWidgets.QLabel):
     http://stackoverflow.com/questions/5653114/
             display-image-in-qt-to-fit-label-size
     """
+    # emitted when an image requested with setImageSource has been set
+    imageLoaded = QtCore.pyqtSignal()
+
     @classmethod
     def fitPixmapIntoRect(cls, rect, pixmap, sourcepixmap=None,
                           mode=Qt.SmoothTransformation):
@@ -457,37 +1514,152 @@ class QPixmapLabel(QtWidgets.QLabel):
         # won't break the quality
         self.source = pixmap  # original pixmap
         self.current = pixmap  # current pixmap
+        # scaled versions of the source, keyed by scaledKey
+        self.cache = LRUCache(8)
+        self._currentkey = None  # the scaledKey of the current pixmap
+        # progressive scaling shows fast previews while the label is
+        # resized and rescales smoothly once resizing has stopped
+        self._progressive = False
+        self._smoothtimer = QtCore.QTimer(self)
+        self._smoothtimer.setSingleShot(True)
+        self._smoothtimer.setInterval(150)
+        self._smoothtimer.timeout.connect(self._finishProgressiveResize)
+        # with mipmapping, pixmaps are scaled from a pyramid of half
+        # resolution levels instead of the full size source
+        self._mipmapping = False
+        self.pyramid = None  # a QPixmapPyramid instance
+        # the pending QImageLoader of setImageSource and its request id
+        self._loader = None
+        self._loadid = 0
         # any size is useful, but the bigger the widget the better
         QSPol = QtWidgets.QSizePolicy
         self.setSizePolicy(QSPol(QSPol.Expanding, QSPol.Expanding))
 
-    def resizePixmap(self, size):
+    def scaledKey(self, size, mode=None):
+        """Returns the cache key for the source scaled to fit into size."""
+        if mode is None:
+            mode = self.mode
+        return (self.source.cacheKey(), size.width(), size.height(), mode)
+
+    def cacheSize(self):
+        """The number of scaled pixmaps kept in the cache."""
+        return self.cache.maxCount()
+
+    def setCacheSize(self, val):
+        self.cache.setMaxCount(val)
+
+    def cacheStats(self):
+        """Returns a dict with the hits and misses of the pixmap cache."""
+        return self.cache.stats()
+
+    def progressive(self):
+        """True if resizing shows fast previews before scaling smoothly."""
+        return self._progressive
+
+    def setProgressive(self, val):
+        self._progressive = val
+        if val is False and self._smoothtimer.isActive():
+            self._smoothtimer.stop()
+            self._finishProgressiveResize()
+
+    def progressiveDelay(self):
+        """Milliseconds without resize events before scaling smoothly."""
+        return self._smoothtimer.interval()
+
+    def setProgressiveDelay(self, msec):
+        self._smoothtimer.setInterval(msec)
+
+    def mipmapping(self):
+        """True if the pixmap is scaled from a pyramid of the source."""
+        return self._mipmapping
+
+    def setMipmapping(self, val):
+        self._mipmapping = val
+        if val is True:
+            self.pyramid = QPixmapPyramid(self.source)
+        else:
+            self.pyramid = None
+
+    def mipmapBytes(self):
+        """Returns the memory in bytes used by the mipmap levels."""
+        if self.pyramid is None:
+            return 0
+        return self.pyramid.nbytes()
+
+    def dropUnusedMipmaps(self, maxage):
+        """Drops mipmap levels that were not used in the last maxage seconds.
+
+        Returns the number of dropped levels.
+        """
+        if self.pyramid is None:
+            return 0
+        return self.pyramid.dropUnused(maxage)
+
+    def resizePixmap(self, size, mode=None):
         """Resizes the pixmap so it fits into size.
 
+        Scaled pixmaps are cached, so resizing to a size that was used
+        recently does not scale the source again. If mode is given it is
+        used instead of the mode of this label and the result is not
+        cached, which is meant for temporary previews.
         The caller is responsible for handling the results of this resize,
         like notifying the layout about the geometry update.
         """
+        if mode is None:
+            mode = self.mode
+        key = self.scaledKey(size, mode)
+        self._currentkey = key
         if size.width() == 0 or size.height() == 0:
             self.current = QtGui.QPixmap()
             msg = "QPixmapLabel is invisible because width or height are 0"
             log.warning(msg)
-        else:
-            self.current = self.fitPixmapIntoRect(size, self.current,
-                                                  sourcepixmap=self.source,
-                                                  mode=self.mode)
+            return
+        if mode != self.mode:
+            self.current = self.fitPixmapIntoRect(
+                size, self.current, sourcepixmap=self.scaleSource(size),
+                mode=mode)
+            return
+        pixmap = self.cache.get(key)
+        if pixmap is None:
+            pixmap = self.fitPixmapIntoRect(
+                size, self.current, sourcepixmap=self.scaleSource(size),
+                mode=mode)
+            self.cache.put(key, pixmap)
+        self.current = pixmap
+
+    def scaleSource(self, size):
+        """Returns the pixmap that is scaled to fit the source into size."""
+        if self.pyramid is None:
+            return self.source
+        return self.pyramid.pixmapFor(size)
 
     def resizeEvent(self, event):
         # resize pixmap to fit into new size
-        self.resizePixmap(event.size())
+        if self._progressive and self.mode != Qt.FastTransformation:
+            # show a fast preview until resizing has been idle for a while
+            self.resizePixmap(event.size(), Qt.FastTransformation)
+            self._smoothtimer.start()
+        else:
+            self.resizePixmap(event.size())
         # resize widget
         QtWidgets.QLabel.resizeEvent(self, event)
 
+    def _finishProgressiveResize(self):
+        """Replaces the fast preview with a smoothly scaled pixmap."""
+        self.resizePixmap(self.size())
+        self.update()
+
     def paintEvent(self, event):
         if self.source is None:  # no image was set, don't draw anything
             return
         QtWidgets.QLabel.paintEvent(self, event)
-        # fit the pixmap into the current widget size
-        self.resizePixmap(self.rect())
+        # the pixmap is fitted on resize, only fit it here if the source
+        # or the mode have changed since then
+        mode = self.mode
+        if self._smoothtimer.isActive():
+            mode = Qt.FastTransformation  # keep the preview until resized
+        if self._currentkey != self.scaledKey(self.size(), mode):
+            self.resizePixmap(self.size(), mode)
         # determine the widget coords for the top left corner of the pixmap
         x = round((self.width() - self.current.width()) / 2)
         y = round((self.height() - self.current.height()) / 2)
@@ -504,16 +1676,69 @@ class QPixmapLabel(QtWidgets.QLabel):
             return QtWidgets.QLabel.sizeHint(self)
 
     def setPixmap(self, pixmap):
-        """Sets a new source image for this label."""
+        """Sets a new source image for this label.
+
+        If mipmapping is enabled, a new pyramid is created for the pixmap.
+        Its levels are only scaled when they are needed.
+        """
         if pixmap.isNull():
             log.error("Setting emtpy pixmap, using default instead")
             self.clear()
         else:
+            if pixmap.cacheKey() != self.source.cacheKey():
+                # scaled copies of the previous source are of no use
+                self.cache.clear()
             self.source = self.current = pixmap
+            if self._mipmapping is True:
+                self.pyramid = QPixmapPyramid(pixmap)
             self.update()
         # notify layout about size hint change
         self.updateGeometry()
 
+    def setImageSource(self, source, placeholder=None):
+        """Decodes an image file path or image data bytes on a worker thread.
+
+        The image is also prescaled to the current size of this label. Until
+        it arrives the placeholder pixmap is shown, or a transparent pixmap
+        if placeholder is None. A pending request is cancelled and its
+        result discarded when a newer one is made. imageLoaded is emitted
+        when the new source has been set.
+        """
+        pool = QtCore.QThreadPool.globalInstance()
+        if self._loader is not None:
+            self._loader.cancel()
+            try:
+                pool.tryTake(self._loader)
+            except RuntimeError:
+                # the pool deletes loaders after running them, the result
+                # of this one is still queued and discarded by its loadid
+                pass
+            self._loader = None
+        self._loadid += 1
+        if placeholder is None:
+            self.clear(QtGui.QColor(Qt.transparent))
+        else:
+            self.setPixmap(placeholder)
+        loader = QImageLoader(self._loadid, source, self.size(), self.mode)
+        loader.signals.finished.connect(self._imageSourceLoaded)
+        self._loader = loader
+        pool.start(loader)
+
+    def _imageSourceLoaded(self, loadid, image, scaled, size):
+        """Sets the image decoded by a QImageLoader as new source."""
+        if loadid != self._loadid:
+            return  # a newer image source has been requested meanwhile
+        self._loader = None
+        if image.isNull():
+            log.error("Could not decode the image source")
+            return
+        self.setPixmap(QtGui.QPixmap.fromImage(image))
+        if not scaled.isNull():
+            # reuse the prescaled image, so painting doesn't rescale
+            self.cache.put(self.scaledKey(size),
+                           QtGui.QPixmap.fromImage(scaled))
+        self.imageLoaded.emit()
+
     def clear(self, emptycolor=QtGui.QColor("magenta")):
         """Replace current pixmap with colored rectangle of the same size."""
         width = self.current.width()
@@ -569,12 +1794,343 @@ class QPixmapLabel(QtWidgets.QLabel):
         return self.currentRect().topLeft()
 
 
+class QTiledImageLabel(QtWidgets.QWidget):
+    """A widget that displays a large image by decoding visible tiles only.
+
+    The image is split into square tiles of tilesize pixels. A tile is only
+    decoded when it intersects the painted area, at the power of two
+    reduction that best matches the current scale. As background of a
+    QScalingNoticeBoard, that scale equals the scale of its QScalingLayout.
+    Decoded tiles are kept in an LRU cache with a byte budget.
+
+    Image files in formats that support clipping, like JPEG, are read with
+    QImageReader clip rects. Other formats, like PNG, are decoded once into
+    a memory-mapped temporary file. Raw pixel files are memory-mapped
+    directly, so tiles are read from the mapped file.
+    """
+    def __init__(self, tilesize=256, maxbytes=64 * 2**20, parent=None):
+        QtWidgets.QWidget.__init__(self, parent=parent)
+        self.tilesize = tilesize
+        self.path = None
+        self.cache = LRUCache(None, maxbytes, pixmapBytes)
+        self._imagesize = QtCore.QSize()
+        # memory map, address and layout of a raw image file
+        self._mmap = None
+        self._address = 0
+        self._rawformat = None
+        self._bytesperline = 0
+        self._bytesperpixel = 0
+        QSPol = QtWidgets.QSizePolicy
+        self.setSizePolicy(QSPol(QSPol.Expanding, QSPol.Expanding))
+
+    def setImageFile(self, path):
+        """Displays the image file at path.
+
+        Formats without clip rect support are decoded once, which needs the
+        memory of the full image while decoding.
+        """
+        reader = QtGui.QImageReader(path)
+        size = reader.size()
+        if not size.isValid():
+            raise ValueError("Can not read the size of image %s: %s"
+                             % (path, reader.errorString()))
+        if reader.supportsOption(QtGui.QImageIOHandler.ClipRect):
+            self._setImage(path, size)
+            return
+        image = reader.read()
+        if image.isNull():
+            raise ValueError("Can not decode image %s: %s"
+                             % (path, reader.errorString()))
+        image = image.convertToFormat(QtGui.QImage.Format_ARGB32_Premultiplied)
+        bits = image.constBits()
+        bits.setsize(image.sizeInBytes())
+        # the mapping keeps the anonymous file alive after it is closed
+        with tempfile.TemporaryFile() as rawfile:
+            rawfile.write(memoryview(bits))
+            rawfile.flush()
+            self._mapRawImage(path, rawfile, image.width(), image.height(),
+                              image.format(), 0, image.bytesPerLine())
+
+    def setRawImageFile(self, path, width, height,
+                        imageformat=QtGui.QImage.Format_ARGB32, offset=0,
+                        bytesperline=None):
+        """Displays a file of raw pixels in imageformat.
+
+        The pixel data starts at offset bytes into the file, bytesperline
+        defaults to tightly packed rows.
+        """
+        with open(path, "rb") as rawfile:
+            self._mapRawImage(path, rawfile, width, height, imageformat,
+                              offset, bytesperline)
+
+    def _mapRawImage(self, path, rawfile, width, height, imageformat, offset,
+                     bytesperline):
+        depth = QtGui.QImage(1, 1, imageformat).depth()
+        if depth % 8 != 0:
+            raise ValueError("Raw images need whole bytes per pixel")
+        if bytesperline is None:
+            bytesperline = width * depth // 8
+        mapping = mmap.mmap(rawfile.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(mapping) < offset + height * bytesperline:
+            mapping.close()
+            raise ValueError("File %s is too small for a %sx%s image"
+                             % (path, width, height))
+        self._setImage(path, QtCore.QSize(width, height))
+        self._mmap = mapping
+        self._address = int(sip.voidptr(mapping)) + offset
+        self._rawformat = imageformat
+        self._bytesperline = bytesperline
+        self._bytesperpixel = depth // 8
+
+    def _setImage(self, path, size):
+        self.path = path
+        self._imagesize = size
+        self._mmap = None
+        self.cache.clear()
+        self.updateGeometry()
+        self.update()
+
+    def imageSize(self):
+        """Returns the size of the full image."""
+        return QtCore.QSize(self._imagesize)
+
+    def sizeHint(self):
+        if self._imagesize.isValid():
+            return QtCore.QSize(self._imagesize)
+        return QtWidgets.QWidget.sizeHint(self)
+
+    def cacheStats(self):
+        """Returns a dict with the hits, misses and bytes of the tile cache."""
+        return self.cache.stats()
+
+    def scale(self):
+        """The ratio of the displayed image size to the full image size."""
+        if not self._imagesize.isValid():
+            return 1.0
+        imagerect = QtCore.QRect(QtCore.QPoint(0, 0), self._imagesize)
+        return calculateScale(imagerect, self.rect())[0]
+
+    def currentRect(self):
+        """Return a QRect for the local coordinates of the displayed image."""
+        scale = self.scale()
+        imgw = round(self._imagesize.width() * scale)
+        imgh = round(self._imagesize.height() * scale)
+        left = round((self.width() - imgw) / 2)
+        top = round((self.height() - imgh) / 2)
+        return QtCore.QRect(left, top, imgw, imgh)
+
+    def tileRect(self, level, column, row):
+        """Returns the part of the image covered by a tile at level."""
+        span = self.tilesize * 2**level
+        rect = QtCore.QRect(column * span, row * span, span, span)
+        return rect.intersected(QtCore.QRect(QtCore.QPoint(0, 0),
+                                             self._imagesize))
+
+    def tile(self, level, column, row):
+        """Returns the decoded tile, which is reduced by 2**level."""
+        key = (level, column, row)
+        image = self.cache.get(key)
+        if image is None:
+            rect = self.tileRect(level, column, row)
+            factor = 2**level
+            size = QtCore.QSize(max(1, -(-rect.width() // factor)),
+                                max(1, -(-rect.height() // factor)))
+            image = self.readTile(rect, size)
+            if image.isNull():
+                log.warning("Could not decode tile %s of %s", key, self.path)
+            self.cache.put(key, image)
+        return image
+
+    def readTile(self, rect, size):
+        """Reads the rect of the image and scales it to size."""
+        if self._mmap is None:
+            reader = QtGui.QImageReader(self.path)
+            reader.setClipRect(rect)
+            reader.setScaledSize(size)
+            return reader.read()
+        # wrap the tile in the memory map without copying, then detach it
+        address = (self._address + rect.top() * self._bytesperline +
+                   rect.left() * self._bytesperpixel)
+        image = QtGui.QImage(sip.voidptr(address), rect.width(),
+                             rect.height(), self._bytesperline,
+                             self._rawformat)
+        if size == rect.size():
+            return image.copy()
+        return image.scaled(size, Qt.IgnoreAspectRatio,
+                            Qt.SmoothTransformation)
+
+    def paintEvent(self, event):
+        if self.path is None:
+            return
+        target = self.currentRect()
+        exposed = event.rect().intersected(target)
+        if exposed.isEmpty():
+            return
+        scale = self.scale()
+        # use the strongest reduction that still has enough pixels
+        level = 0
+        while scale * 2**(level + 1) <= 1:
+            level += 1
+        span = self.tilesize * 2**level
+        # determine the tiles intersecting the exposed area
+        left = int((exposed.left() - target.left()) / scale // span)
+        top = int((exposed.top() - target.top()) / scale // span)
+        right = int((exposed.right() - target.left()) / scale // span)
+        bottom = int((exposed.bottom() - target.top()) / scale // span)
+        painter = QtGui.QPainter(self)
+        painter.setRenderHint(QtGui.QPainter.SmoothPixmapTransform)
+        for row in range(top, bottom + 1):
+            for column in range(left, right + 1):
+                rect = self.tileRect(level, column, row)
+                if rect.isEmpty():
+                    continue
+                drawrect = QtCore.QRectF(target.left() + rect.left() * scale,
+                                         target.top() + rect.top() * scale,
+                                         rect.width() * scale,
+                                         rect.height() * scale)
+                painter.drawImage(drawrect, self.tile(level, column, row))
+
+
+class QImageLoaderSignals(QtCore.QObject):
+    """The signals of a QImageLoader, since QRunnable is not a QObject."""
+    # request id, decoded image, prescaled image, size used for prescaling
+    finished = QtCore.pyqtSignal(int, QtGui.QImage, QtGui.QImage,
+                                 QtCore.QSize)
+
+
+class QImageLoader(QtCore.QRunnable):
+    """Decodes and prescales an image on a QThreadPool worker.
+
+    The source is either a file path or bytes with encoded image data.
+    Only QImage is used here, since QPixmap must stay in the GUI thread.
+    The result is emitted with signals.finished, unless the loader has
+    been cancelled.
+    """
+    def __init__(self, loadid, source, size, mode=Qt.SmoothTransformation):
+        QtCore.QRunnable.__init__(self)
+        self.loadid = loadid
+        self.source = source
+        self.size = QtCore.QSize(size)
+        self.mode = mode
+        self.signals = QImageLoaderSignals()
+        self._cancelled = False
+
+    def cancel(self):
+        """Stops the loader at the next opportunity and drops its result."""
+        self._cancelled = True
+
+    def cancelled(self):
+        return self._cancelled
+
+    def run(self):
+        if self._cancelled:
+            return
+        if isinstance(self.source, (bytes, bytearray, QtCore.QByteArray)):
+            image = QtGui.QImage.fromData(self.source)
+        else:
+            image = QtGui.QImageReader(self.source).read()
+        if self._cancelled:
+            return
+        scaled = QtGui.QImage()
+        if (not image.isNull() and self.size.width() > 0 and
+                self.size.height() > 0):
+            scaled = QPixmapLabel.fitPixmapIntoRect(self.size, image,
+                                                    mode=self.mode)
+        if self._cancelled:
+            return
+        self.signals.finished.emit(self.loadid, image, scaled, self.size)
+
+
+class QPixmapPyramid(object):
+    """A pyramid of half resolution levels of a source pixmap.
+
+    Level 0 is the source, each further level halves the width and height
+    of the previous level. Levels are scaled lazily when first requested.
+    """
+    def __init__(self, source, mode=Qt.SmoothTransformation):
+        self.source = source
+        self.mode = mode
+        self.levels = {0: source}  # maps level number to pixmap
+        self.lastused = {0: time.monotonic()}  # maps level number to time
+
+    def levelSize(self, level):
+        """Returns the size of the pixmap at level."""
+        width = self.source.width()
+        height = self.source.height()
+        for _ in range(level):
+            width = max(1, width // 2)
+            height = max(1, height // 2)
+        return QtCore.QSize(width, height)
+
+    def levelFor(self, size):
+        """Returns the smallest level that is not smaller than the source
+        fitted into size."""
+        scale, limiter = calculateScale(self.source.rect(), size)
+        targetwidth = round(self.source.width() * scale)
+        targetheight = round(self.source.height() * scale)
+        width = self.source.width()
+        height = self.source.height()
+        level = 0
+        while (width > 1 and height > 1 and
+               width // 2 >= targetwidth and height // 2 >= targetheight):
+            width = width // 2
+            height = height // 2
+            level += 1
+        return level
+
+    def pixmap(self, level):
+        """Returns the pixmap at level, scaling missing levels first."""
+        if level not in self.levels:
+            # halve the nearest existing level until we reach level
+            base = max(lvl for lvl in self.levels if lvl < level)
+            pixmap = self.levels[base]
+            for lvl in range(base + 1, level + 1):
+                pixmap = pixmap.scaled(self.levelSize(lvl),
+                                       Qt.IgnoreAspectRatio, self.mode)
+                self.levels[lvl] = pixmap
+                self.lastused[lvl] = time.monotonic()
+        self.lastused[level] = time.monotonic()
+        return self.levels[level]
+
+    def pixmapFor(self, size):
+        """Returns the smallest pixmap suitable for scaling into size."""
+        return self.pixmap(self.levelFor(size))
+
+    def nbytes(self):
+        """Returns the memory in bytes used by the levels above 0."""
+        return sum(pixmapBytes(pixmap) for level, pixmap
+                   in self.levels.items() if level > 0)
+
+    def dropUnused(self, maxage):
+        """Drops the levels above 0 that were not used for maxage seconds.
+
+        Returns the number of dropped levels.
+        """
+        deadline = time.monotonic() - maxage
+        unused = [level for level, used in self.lastused.items()
+                  if level > 0 and used < deadline]
+        for level in unused:
+            del self.levels[level]
+            del self.lastused[level]
+        return len(unused)
+
+
 class QTableItem(object):
+    """A table cell, which maps roles to values and has flags.
+
+    Items use slots and keep the DisplayRole value in its own slot. Other
+    roles are stored in a dict that is only created when such a role is
+    set, until then all items share one empty mapping.
+    """
+    __slots__ = ("display", "roles", "flags")
     default_flags = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+    noroles = types.MappingProxyType({})  # shared by items without roles
+    unset = object()  # the display value of items without DisplayRole
 
     def __init__(self, datamap=None, flags=None):
         if datamap is None:
-            self.datamap = {Qt.DisplayRole: ""}  # maps roles to values
+            self.display = ""
+            self.roles = self.noroles
         else:
             self.datamap = datamap  # TODO: validity check?
         if flags is None:
@@ -582,12 +2138,122 @@ class QTableItem(object):
         else:
             self.flags = flags
 
+    @property
+    def datamap(self):
+        """A mutable mapping of roles to values, backed by this item."""
+        return ItemDataMap(self)
+
+    @datamap.setter
+    def datamap(self, datamap):
+        datamap = dict(datamap)
+        self.display = datamap.pop(Qt.DisplayRole, self.unset)
+        self.roles = datamap if datamap else self.noroles
+
     def data(self, role=Qt.DisplayRole):
-        return self.datamap.get(role, QtCore.QVariant())
+        if role == Qt.DisplayRole:
+            if self.display is self.unset:
+                return QtCore.QVariant()
+            return self.display
+        return self.roles.get(role, QtCore.QVariant())
 
     def setData(self, value, role=Qt.DisplayRole):
         # TODO: validity check?
-        self.datamap[role] = value
+        if role == Qt.DisplayRole:
+            self.display = value
+        else:
+            if self.roles is self.noroles:
+                self.roles = {}  # copy on write
+            self.roles[role] = value
+
+    def removeData(self, role):
+        """Removes the value of role, raises KeyError if it is not set."""
+        if role == Qt.DisplayRole:
+            if self.display is self.unset:
+                raise KeyError(role)
+            self.display = self.unset
+        else:
+            del self.roles[role]
+            if not self.roles:
+                self.roles = self.noroles
+
+
+class ItemDataMap(collections.abc.MutableMapping):
+    """The roles and values of a QTableItem as a mutable mapping."""
+    __slots__ = ("item",)
+
+    def __init__(self, item):
+        self.item = item
+
+    def __getitem__(self, role):
+        if role == Qt.DisplayRole:
+            if self.item.display is QTableItem.unset:
+                raise KeyError(role)
+            return self.item.display
+        return self.item.roles[role]
+
+    def __setitem__(self, role, value):
+        self.item.setData(value, role)
+
+    def __delitem__(self, role):
+        self.item.removeData(role)
+
+    def __iter__(self):
+        if self.item.display is not QTableItem.unset:
+            yield Qt.DisplayRole
+        yield from list(self.item.roles)
+
+    def __len__(self):
+        return (len(self.item.roles) +
+                (self.item.display is not QTableItem.unset))
+
+
+class RowItemMap(collections.abc.MutableMapping):
+    """A mapping of (row, column) keys to the items of a list of rows.
+
+    Each row is a dict that maps columns to items. Rows can be inserted
+    and removed without rewriting the keys of all following items.
+    """
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __getitem__(self, key):
+        row, column = key
+        if row < 0:
+            raise KeyError(key)
+        try:
+            return self.rows[row][column]
+        except IndexError:
+            raise KeyError(key)
+
+    def __setitem__(self, key, item):
+        row, column = key
+        if row < 0:
+            raise KeyError(key)
+        rows = self.rows
+        if row >= len(rows):
+            rows.extend({} for i in range(row + 1 - len(rows)))
+        rows[row][column] = item
+
+    def __delitem__(self, key):
+        row, column = key
+        if row < 0:
+            raise KeyError(key)
+        try:
+            del self.rows[row][column]
+        except IndexError:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        row, column = key
+        return 0 <= row < len(self.rows) and column in self.rows[row]
+
+    def __iter__(self):
+        for row, items in enumerate(self.rows):
+            for column in items:
+                yield (row, column)
+
+    def __len__(self):
+        return sum(len(items) for items in self.rows)
 
 
 class QTableModel(QtCore.QAbstractTableModel):
@@ -596,11 +2262,25 @@ class QTableModel(QtCore.QAbstractTableModel):
     Might also be useful as base class when implementing more complex
     table models.
     """
+    # models that can not add or remove rows set this to True, which makes
+    # insertRows, removeRows, appendRows and replaceAll return False
+    fixed_rows = False
+
     def __init__(self, column_headers, row_headers=None, parent=None):
         super().__init__(parent)
         self.colhead = []
         self.rowhead = []
-        self.datamap = {}  # maps model key to item
+        self.rows = []  # a dict for each row, which maps columns to items
+        self.datamap = RowItemMap(self.rows)  # maps model key to item
+        # sorting and filtering maps view rows to storage rows
+        self.rowmap = None  # a list of storage rows or None
+        self.sortkeys = {}  # maps columns to lists of sort keys
+        self._sortcolumn = -1
+        self._sortorder = Qt.AscendingOrder
+        self._filter = None  # a column and a predicate
+        # batchUpdate collects changed cells and emits them merged
+        self._changes = None  # maps roles to sets of (row, column) or None
+        self._batchdepth = 0
 
         # add headers
         for text in column_headers:
@@ -609,13 +2289,22 @@ class QTableModel(QtCore.QAbstractTableModel):
             for text in row_headers:
                 item = self.createHeaderItem({Qt.DisplayRole: text})
                 self.rowhead.append(item)
+                self.rows.append({})
 
     def createHeaderItem(self, datamap=None, flags=None):
         return QTableItem(datamap, flags)
 
     def createKey(self, index):
-        """Converts a model index to a (row, column) tuple."""
-        return (index.row(), index.column())
+        """Converts a model index to a (row, column) tuple.
+
+        The row is the storage row, which differs from the row of the
+        index if the model is sorted or filtered.
+        """
+        row = index.row()
+        rowmap = self.rowmap
+        if rowmap is not None and 0 <= row < len(rowmap):
+            row = rowmap[row]
+        return (row, index.column())
 
     createItem = createHeaderItem
 
@@ -626,16 +2315,31 @@ class QTableModel(QtCore.QAbstractTableModel):
         if parent.isValid():
             # see http://doc.qt.io/qt-5/qabstractitemmodel.html#rowCount
             return 0
+        elif self.rowmap is not None:
+            return len(self.rowmap)  # the model is sorted or filtered
         else:
-            return len(self.rowhead)  # TODO: check the meaning of parent
+            return self.storageRowCount()
+
+    def storageRowCount(self):
+        """Returns the number of stored rows, ignoring sort and filter."""
+        return len(self.rowhead)
 
     def columnCount(self, parent=QtCore.QModelIndex()):
         return len(self.colhead)
 
+    def item(self, row, column):
+        """Returns the item of a storage row and column or None."""
+        if row < 0:
+            return None
+        try:
+            return self.rows[row].get(column)
+        except IndexError:
+            return None
+
     def data(self, index, role=Qt.DisplayRole):
-        key = self.createKey(index)
-        if key in self.datamap:
-            return self.datamap[key].data(role)
+        item = self.item(*self.createKey(index))
+        if item is not None:
+            return item.data(role)
         # if we have no data for that role or index, we return an
         # invalid QVariant; why return that?
         # see: http://doc.qt.io/qt-5/qabstractitemmodel.html#data
@@ -646,6 +2350,8 @@ class QTableModel(QtCore.QAbstractTableModel):
             header = self.colhead
         elif orientation == Qt.Vertical:
             header = self.rowhead
+            if self.rowmap is not None and 0 <= section < len(self.rowmap):
+                section = self.rowmap[section]
         else:
             raise ValueError("Not a valid Qt orientation: %s" % orientation)
         try:
@@ -658,11 +2364,397 @@ class QTableModel(QtCore.QAbstractTableModel):
         return QtCore.QVariant()
 
     def flags(self, index):
-        key = self.createKey(index)
+        item = self.item(*self.createKey(index))
+        if item is not None:
+            return item.flags
+        return Qt.NoItemFlags
+
+    def createRow(self, values):
+        """Returns the storage for a row, a dict that maps columns to items.
+
+        Values that are not QTableItems become the DisplayRole of a new
+        item, None leaves the cell empty.
+        """
+        row = {}
+        for column, value in enumerate(values):
+            if value is None:
+                continue
+            if not isinstance(value, QTableItem):
+                value = self.createItem({Qt.DisplayRole: value})
+            row[column] = value
+        return row
+
+    def insertRowData(self, row, rows):
+        """Inserts the storage for a list of rows before row.
+
+        Each row is a sequence of values, one for each column. This and
+        removeRowData and clearRowData are the hooks for other storages.
+        """
+        self.rows[row:row] = [self.createRow(values) for values in rows]
+
+    def removeRowData(self, row, count):
+        """Removes the storage of count rows starting with row."""
+        del self.rows[row:row + count]
+
+    def clearRowData(self):
+        """Removes the storage of all rows."""
+        del self.rows[:]
+
+    def insertRowHeaders(self, row, count, headers=None):
+        """Inserts count row header items before row.
+
+        Without headers the items are empty, so views show row numbers.
+        """
+        if headers is None:
+            items = [self.createHeaderItem({}) for i in range(count)]
+        else:
+            items = []
+            for header in headers:
+                if not isinstance(header, QTableItem):
+                    header = self.createHeaderItem({Qt.DisplayRole: header})
+                items.append(header)
+            if len(items) != count:
+                raise ValueError("Expected %s row headers, got %s" %
+                                 (count, len(items)))
+        self.rowhead[row:row] = items
+
+    def insertRows(self, row, count, parent=QtCore.QModelIndex()):
+        """Inserts count empty rows before row.
+
+        A sorted or filtered model shows the new rows at their sorted
+        position and only if they pass the filter, so they may not stay at
+        row.
+        """
+        if (parent.isValid() or count < 1 or
+            not 0 <= row <= self.rowCount() or
+            self._refuseRowChange()):
+            return False
+        if self.rowmap is not None:
+            # insert before the storage row shown at row
+            if row < len(self.rowmap):
+                row = self.rowmap[row]
+            else:
+                row = self.storageRowCount()
+        self._insertStorageRows(row, [()] * count)
+        return True
+
+    def removeRows(self, row, count, parent=QtCore.QModelIndex()):
+        """Removes count rows starting with row."""
+        if (parent.isValid() or count < 1 or row < 0 or
+            row + count > self.rowCount() or
+            self._refuseRowChange()):
+            return False
+        self.beginRemoveRows(QtCore.QModelIndex(), row, row + count - 1)
+        if self.rowmap is None:
+            self._removeStorageRows(row, count)
+        else:
+            # the view rows are scattered in storage, so remove them in
+            # runs of adjacent storage rows, the last run first
+            removed = sorted(self.rowmap[row:row + count])
+            del self.rowmap[row:row + count]
+            runs = []
+            for storagerow in reversed(removed):
+                if runs and runs[-1][0] == storagerow + 1:
+                    runs[-1] = (storagerow, runs[-1][1] + 1)
+                else:
+                    runs.append((storagerow, 1))
+            for first, length in runs:
+                self._removeStorageRows(first, length)
+            # close the gaps of the removed rows in the remaining ones
+            self.rowmap = [storagerow - bisect.bisect_left(removed,
+                                                           storagerow)
+                           for storagerow in self.rowmap]
+        self.endRemoveRows()
+        return True
+
+    def appendRows(self, rows, headers=None):
+        """Appends rows, each a sequence of values, one for each column.
+
+        The optional headers are the row headers of the new rows. Returns
+        False if the model can not add rows.
+        """
+        if self._refuseRowChange():
+            return False
+        rows = list(rows)
+        if not rows:
+            return True
+        self._insertStorageRows(self.storageRowCount(), rows, headers)
+        return True
+
+    def replaceAll(self, rows, headers=None):
+        """Replaces all rows and resets the model.
+
+        The sort order and the filter are applied to the new rows. Returns
+        False if the model can not replace its rows.
+        """
+        if self._refuseRowChange():
+            return False
+        rows = list(rows)
+        self.beginResetModel()
+        self.rowmap = None
+        self.sortkeys = {}
+        del self.rowhead[:]
+        self.clearRowData()
+        self.insertRowHeaders(0, len(rows), headers)
+        self.insertRowData(0, rows)
+        self.rowmap = self._sortedRows(self._filteredRows())
+        self.endResetModel()
+        return True
+
+    def _refuseRowChange(self):
+        # returns True and logs if the rows of this model can not change
+        if self.fixed_rows:
+            log.error("%s can not add or remove rows",
+                      type(self).__name__)
+        return self.fixed_rows
+
+    def _insertStorageRows(self, row, rows, headers=None):
+        # inserts rows before the storage row and shows them in the view,
+        # the cached sort keys and the row map are updated, not rebuilt
+        count = len(rows)
+        if self.rowmap is None:
+            self.beginInsertRows(QtCore.QModelIndex(), row, row + count - 1)
+        self.insertRowHeaders(row, count, headers)
+        self.insertRowData(row, rows)
+        for column, keys in self.sortkeys.items():
+            keys[row:row] = [self.sortKey(value) for value in
+                             self.columnValues(column, row, count)]
+        if self.rowmap is None:
+            self.endInsertRows()
+            return
+        if row < self.storageRowCount() - count:
+            self.rowmap = [storagerow + count if storagerow >= row
+                           else storagerow for storagerow in self.rowmap]
+        newrows = range(row, row + count)
+        if self._filter is not None:
+            column, predicate = self._filter
+            values = self.columnValues(column, row, count)
+            newrows = [newrow for newrow, value in zip(newrows, values)
+                       if predicate(value)]
+        self._insertViewRows(newrows)
+
+    def _removeStorageRows(self, row, count):
+        # removes count storage rows and their cached sort keys
+        del self.rowhead[row:row + count]
+        self.removeRowData(row, count)
+        for keys in self.sortkeys.values():
+            del keys[row:row + count]
+
+    def _insertViewRows(self, rows):
+        # merges new storage rows, which are not in the row map yet, into
+        # the sorted row map and emits an insert for each run of them
+        rowmap = self.rowmap
+        if self._sortcolumn < 0:
+            positions = [bisect.bisect_left(rowmap, row) for row in rows]
+        else:
+            keys = self.sortKeys(self._sortcolumn)
+            descending = self._sortorder == Qt.DescendingOrder
+            rows = sorted(rows, key=keys.__getitem__, reverse=descending)
+            positions = [self._sortedPosition(keys, descending, row)
+                         for row in rows]
+        inserted = 0
+        for position, run in itertools.groupby(zip(positions, rows),
+                                               lambda pair: pair[0]):
+            run = [row for position, row in run]
+            first = position + inserted
+            self.beginInsertRows(QtCore.QModelIndex(), first,
+                                 first + len(run) - 1)
+            rowmap[first:first] = run
+            self.endInsertRows()
+            inserted += len(run)
+
+    def _sortedPosition(self, keys, descending, row):
+        # returns where row belongs in the sorted row map, rows with equal
+        # keys stay in storage order like with a stable sort
+        rowmap = self.rowmap
+        key = keys[row]
+        low, high = 0, len(rowmap)
+        while low < high:
+            middle = (low + high) // 2
+            other = rowmap[middle]
+            otherkey = keys[other]
+            if otherkey == key:
+                before = other < row
+            elif descending:
+                before = otherkey > key
+            else:
+                before = otherkey < key
+            if before:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    @contextlib.contextmanager
+    def batchUpdate(self):
+        """A context manager that merges the dataChanged signals of edits.
+
+        Inside the block setData only records the changed cells. When the
+        outermost block ends, one dataChanged signal is emitted for each
+        rectangle of changed cells and set of roles.
+        """
+        if self._batchdepth == 0:
+            self._changes = {}
+        self._batchdepth += 1
         try:
-            return self.datamap[key].flags
-        except KeyError:
-            return Qt.NoItemFlags
+            yield
+        finally:
+            self._batchdepth -= 1
+            if self._batchdepth == 0:
+                changes = self._changes
+                self._changes = None
+                self._emitChanges(changes)
+
+    def setDataBulk(self, values, role=Qt.EditRole):
+        """Sets the data of many cells and emits merged dataChanged signals.
+
+        values maps (row, column) tuples to values or is an iterable of
+        such pairs. Returns the number of cells that were changed.
+        """
+        if isinstance(values, collections.abc.Mapping):
+            values = values.items()
+        changed = 0
+        with self.batchUpdate():
+            for (row, column), value in values:
+                if self.setData(self.index(row, column), value, role):
+                    changed += 1
+        return changed
+
+    def emitDataChanged(self, index, role):
+        """Emits dataChanged for a cell, or records it during batchUpdate."""
+        if self._changes is None:
+            self.dataChanged.emit(index, index, [role])
+        else:
+            cells = self._changes.setdefault(role, set())
+            cells.add((index.row(), index.column()))
+
+    def _emitChanges(self, changes):
+        # roles that changed the same cells share their signals
+        rolesbycells = {}
+        for role, cells in changes.items():
+            rolesbycells.setdefault(frozenset(cells), []).append(role)
+        for cells, roles in rolesbycells.items():
+            for top, left, bottom, right in cellRectangles(cells):
+                self.dataChanged.emit(self.index(top, left),
+                                      self.index(bottom, right), roles)
+
+    def columnValues(self, column, first=0, count=None):
+        """Returns the DisplayRole values of a column in storage order.
+
+        Only the values of count storage rows from first are returned if
+        count is given.
+        """
+        if count is None:
+            count = self.storageRowCount() - first
+        values = []
+        for row in range(first, first + count):
+            item = self.item(row, column)
+            values.append(None if item is None else item.data())
+        return values
+
+    @staticmethod
+    def sortKey(value):
+        """Returns a key that orders values of mixed types.
+
+        Numbers come first, then other values by their text, then empty
+        cells.
+        """
+        if value is None or isinstance(value, QtCore.QVariant):
+            return (2, 0, "")
+        if isinstance(value, numbers.Real) and not isinstance(value, bool):
+            return (0, value, "")
+        return (1, 0, str(value))
+
+    def sortKeys(self, column):
+        """Returns the cached sort keys of a column in storage order."""
+        keys = self.sortkeys.get(column)
+        if keys is None:
+            keys = [self.sortKey(value)
+                    for value in self.columnValues(column)]
+            self.sortkeys[column] = keys
+        return keys
+
+    def invalidateColumn(self, column):
+        """Drops the cached sort keys of a column after it has changed."""
+        self.sortkeys.pop(column, None)
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        """Sorts the rows by the values of column.
+
+        A negative column restores the storage order.
+        """
+        self._sortcolumn = column
+        self._sortorder = order
+        self._setRowMap(self._sortedRows(self._filteredRows()),
+                        QtCore.QAbstractItemModel.VerticalSortHint)
+
+    def setColumnFilter(self, column, predicate):
+        """Shows only the rows for which predicate(value) is true.
+
+        The predicate is called once for each DisplayRole value of column.
+        """
+        self._filter = (column, predicate)
+        self._setRowMap(self._sortedRows(self._filteredRows()),
+                        QtCore.QAbstractItemModel.NoLayoutChangeHint)
+
+    def clearColumnFilter(self):
+        """Shows all rows again."""
+        self._filter = None
+        self._setRowMap(self._sortedRows(self._filteredRows()),
+                        QtCore.QAbstractItemModel.NoLayoutChangeHint)
+
+    def clearSortAndFilter(self):
+        """Restores the storage order and shows all rows."""
+        hint = self._layoutHint()
+        self._sortcolumn = -1
+        self._filter = None
+        if self.rowmap is not None:
+            self._setRowMap(None, hint)
+
+    def _filteredRows(self):
+        # returns the storage rows that pass the filter or None for all
+        if self._filter is None:
+            return None
+        column, predicate = self._filter
+        values = self.columnValues(column)
+        return [row for row, value in enumerate(values) if predicate(value)]
+
+    def _sortedRows(self, rows):
+        # sorts the storage rows or all rows if rows is None
+        if self._sortcolumn < 0:
+            return rows
+        keys = self.sortKeys(self._sortcolumn)
+        if rows is None:
+            rows = range(len(keys))
+        return sorted(rows, key=keys.__getitem__,
+                      reverse=self._sortorder == Qt.DescendingOrder)
+
+    def _layoutHint(self):
+        # filters change the number of rows, sorting only their order
+        if self._filter is not None:
+            return QtCore.QAbstractItemModel.NoLayoutChangeHint
+        return QtCore.QAbstractItemModel.VerticalSortHint
+
+    def _setRowMap(self, rowmap, hint):
+        # changes the view rows and remaps the persistent indexes
+        self.layoutAboutToBeChanged.emit([], hint)
+        oldindexes = self.persistentIndexList()
+        keys = [self.createKey(index) for index in oldindexes]
+        self.rowmap = rowmap
+        if oldindexes:
+            if rowmap is None:
+                newindexes = [self.index(row, column)
+                              for row, column in keys]
+            else:
+                positions = {row: pos for pos, row in enumerate(rowmap)}
+                newindexes = []
+                for row, column in keys:
+                    if row in positions:
+                        newindexes.append(self.index(positions[row], column))
+                    else:
+                        newindexes.append(QtCore.QModelIndex())
+            self.changePersistentIndexList(oldindexes, newindexes)
+        self.layoutChanged.emit([], hint)
 
 
 class QEditableTableModel(QTableModel):
@@ -677,14 +2769,610 @@ class QEditableTableModel(QTableModel):
         return item
 
     def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid():
+            return False
         key = self.createKey(index)
-        item = self.datamap.get(key, self.createItem(*key))
+        item = self.item(*key)
+        if item is None:
+            item = self.createItem()
+            self.datamap[key] = item
         item.setData(value, role)
-        self.datamap[key] = item
-        self.dataChanged.emit(index, index, [role])
+        self.invalidateColumn(key[1])
+        self.emitDataChanged(index, role)
         return True
 
 
+class QColumnarTableModel(QTableModel):
+    """A table model that stores its data column by column.
+
+    The DisplayRole values of each column are kept in one list or, if a
+    typecode is given for the column, in an array.array. Other roles and
+    flags are only stored for the cells where they were set. This needs
+    far less memory than one QTableItem per cell.
+    """
+    default_flags = QTableItem.default_flags
+
+    def __init__(self, column_headers, row_headers=None, columns=None,
+                 typecodes=None, parent=None):
+        super().__init__(column_headers, row_headers, parent)
+        if typecodes is None:
+            typecodes = [None] * len(self.colhead)
+        self.typecodes = list(typecodes)  # array typecode or None per column
+        if columns is None:
+            columns = [()] * len(self.colhead)
+        self.columns = [self.createColumn(typecode, values)
+                        for typecode, values in zip(self.typecodes, columns)]
+        lengths = set(len(column) for column in self.columns)
+        if len(lengths) > 1:
+            raise ValueError("All columns must have the same length")
+        self.roles = {}  # maps model key to a dict of other roles
+        self.itemflags = {}  # maps model key to flags that differ
+
+    def createColumn(self, typecode, values=()):
+        """Returns the storage for the DisplayRole values of a column."""
+        if typecode is None:
+            return list(values)
+        return array.array(typecode, values)
+
+    def defaultValue(self, column):
+        """Returns the DisplayRole value of new cells in column."""
+        if self.typecodes[column] is None:
+            return ""
+        return 0
+
+    def storageRowCount(self):
+        if not self.columns:
+            return 0
+        return len(self.columns[0])
+
+    def _shiftCells(self, row, delta):
+        # moves the sparse data of cells at or after row by delta rows,
+        # the cells of removed rows are dropped
+        for cells in (self.roles, self.itemflags):
+            shifted = {}
+            for (cellrow, column), value in cells.items():
+                if cellrow < row:
+                    shifted[(cellrow, column)] = value
+                elif cellrow >= row - min(delta, 0):
+                    shifted[(cellrow + delta, column)] = value
+            cells.clear()
+            cells.update(shifted)
+
+    def insertRowData(self, row, rows):
+        rows = list(rows)
+        if row < self.storageRowCount():
+            self._shiftCells(row, len(rows))
+        for column, typecode in enumerate(self.typecodes):
+            default = self.defaultValue(column)
+            values = []
+            for rowvalues in rows:
+                try:
+                    value = rowvalues[column]
+                except IndexError:
+                    value = None
+                values.append(default if value is None else value)
+            self.columns[column][row:row] = self.createColumn(typecode,
+                                                              values)
+
+    def removeRowData(self, row, count):
+        for column in self.columns:
+            del column[row:row + count]
+        self._shiftCells(row, -count)
+
+    def clearRowData(self):
+        self.columns = [self.createColumn(typecode)
+                        for typecode in self.typecodes]
+        self.roles.clear()
+        self.itemflags.clear()
+
+    def insertRowHeaders(self, row, count, headers=None):
+        # row headers are optional for columnar models, so a model without
+        # them does not need an item for each row
+        if headers is None and not self.rowhead:
+            return
+        missing = self.storageRowCount() - len(self.rowhead)
+        if missing > 0:
+            super().insertRowHeaders(len(self.rowhead), missing)
+        super().insertRowHeaders(row, count, headers)
+
+    def columnValues(self, column, first=0, count=None):
+        if first == 0 and count is None:
+            return self.columns[column]
+        if count is None:
+            return self.columns[column][first:]
+        return self.columns[column][first:first + count]
+
+    def cellData(self, row, column, role=Qt.DisplayRole):
+        """Returns the data of a cell by storage row and column."""
+        if role == Qt.DisplayRole:
+            return self.columns[column][row]
+        try:
+            return self.roles[(row, column)][role]
+        except KeyError:
+            return QtCore.QVariant()
+
+    def setCellData(self, row, column, value, role=Qt.DisplayRole):
+        """Sets the data of a cell by storage row and column."""
+        if role == Qt.DisplayRole:
+            self.columns[column][row] = value
+            self.invalidateColumn(column)
+        else:
+            self.roles.setdefault((row, column), {})[role] = value
+
+    def data(self, index, role=Qt.DisplayRole):
+        row, column = self.createKey(index)
+        if (0 <= row < self.storageRowCount() and
+            0 <= column < len(self.columns)):
+            return self.cellData(row, column, role)
+        return QtCore.QVariant()
+
+    def flags(self, index):
+        row, column = key = self.createKey(index)
+        if (0 <= row < self.storageRowCount() and
+            0 <= column < len(self.columns)):
+            return self.itemflags.get(key, self.default_flags)
+        return Qt.NoItemFlags
+
+    def setFlags(self, index, flags):
+        """Sets the flags of a single cell."""
+        key = self.createKey(index)
+        if flags == self.default_flags:
+            self.itemflags.pop(key, None)
+        else:
+            self.itemflags[key] = flags
+
+
+class QEditableColumnarTableModel(QColumnarTableModel):
+    """An editable table model that stores its data column by column.
+    """
+    default_flags = QColumnarTableModel.default_flags | Qt.ItemIsEditable
+
+    def setData(self, index, value, role=Qt.EditRole):
+        row, column = self.createKey(index)
+        if not (0 <= row < self.storageRowCount() and
+                0 <= column < len(self.columns)):
+            return False
+        try:
+            self.setCellData(row, column, value, role)
+        except (TypeError, OverflowError):
+            # the value does not fit into the typed array of the column
+            return False
+        self.emitDataChanged(index, role)
+        return True
+
+
+class QArrayTableModel(QTableModel):
+    """A read-only table model that displays arrays without copying them.
+
+    The data is either a 2-D array, like a NumPy array, or a mapping of
+    column names to 1-D arrays. Values are read and formatted when the view
+    asks for them, so the model needs no memory per cell.
+    """
+    default_flags = QTableItem.default_flags
+    fixed_rows = True  # the rows are those of the array, see setArray
+
+    def __init__(self, data, column_headers=None, row_headers=None,
+                 parent=None):
+        if column_headers is None:
+            column_headers = self.columnNames(data)
+        super().__init__(column_headers, row_headers, parent)
+        self.columns = self.columnViews(data)
+
+    @staticmethod
+    def columnNames(data):
+        """Returns default column headers for data."""
+        try:
+            return [str(name) for name in data.keys()]
+        except AttributeError:
+            return [str(column) for column in range(data.shape[1])]
+
+    def columnViews(self, data):
+        """Returns one 1-D view for each column of data."""
+        try:
+            names = list(data.keys())
+        except AttributeError:
+            if len(data.shape) != 2:
+                raise ValueError("Expected a 2-D array, got shape %s" %
+                                 (data.shape,))
+            # slicing a NumPy array returns a view, which does not copy
+            return [data[:, column] for column in range(data.shape[1])]
+        columns = [data[name] for name in names]
+        if len(set(len(column) for column in columns)) > 1:
+            raise ValueError("All columns must have the same length")
+        return columns
+
+    def setArray(self, data):
+        """Replaces the displayed data, keeping the column headers."""
+        self.beginResetModel()
+        self.rowmap = None
+        self.sortkeys = {}
+        self.columns = self.columnViews(data)
+        self.rowmap = self._sortedRows(self._filteredRows())
+        self.endResetModel()
+
+    def columnValues(self, column, first=0, count=None):
+        if first == 0 and count is None:
+            return self.columns[column]
+        if count is None:
+            return self.columns[column][first:]
+        return self.columns[column][first:first + count]
+
+    def formatValue(self, value, column):
+        """Returns the DisplayRole text for a value of column.
+
+        Reimplement this for custom number formats.
+        """
+        try:
+            value = value.item()  # convert NumPy scalars
+        except AttributeError:
+            pass
+        if isinstance(value, bytes):
+            return value.decode("utf-8", "replace")
+        return str(value)
+
+    def storageRowCount(self):
+        if not self.columns:
+            return 0
+        return len(self.columns[0])
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return QtCore.QVariant()
+        row, column = self.createKey(index)
+        if (0 <= row < self.storageRowCount() and
+            0 <= column < len(self.columns)):
+            return self.formatValue(self.columns[column][row], column)
+        return QtCore.QVariant()
+
+    def flags(self, index):
+        row, column = self.createKey(index)
+        if (0 <= row < self.storageRowCount() and
+            0 <= column < len(self.columns)):
+            return self.default_flags
+        return Qt.NoItemFlags
+
+
+class QStreamingTableModel(QTableModel):
+    """A read-only table model that loads its rows page by page.
+
+    The source is either a page callback, called as source(start, count)
+    and returning up to count rows starting with row start, or an iterable
+    of rows. Each row is a sequence of values, one for each column. Rows
+    are fetched as the view scrolls. With a page callback at most maxpages
+    pages are kept and evicted pages are loaded again when they are
+    needed. Rows of an iterable can not be read twice, so all fetched
+    pages of an iterable are kept and maxpages is ignored.
+    Rows can not be added or removed. Sorting and filtering would need
+    all rows, so sort and setColumnFilter log an error and change nothing.
+    """
+    default_flags = QTableItem.default_flags
+    fixed_rows = True  # the rows are those of the source
+
+    def __init__(self, column_headers, source, pagesize=1000,
+                 totalrows=None, maxpages=16, parent=None):
+        super().__init__(column_headers, None, parent)
+        if callable(source):
+            self._pagesource = source
+            self._iterator = None
+        else:
+            self._pagesource = None
+            self._iterator = iter(source)
+        self.pagesize = pagesize
+        if self._pagesource is None:
+            maxpages = None  # evicted pages could not be read again
+        self.pages = LRUCache(maxpages)  # maps page numbers to lists of rows
+        self._fetched = 0  # the number of rows that views know about
+        self._total = totalrows  # None until the number of rows is known
+
+    def storageRowCount(self):
+        return self._fetched
+
+    def totalRowCount(self):
+        """Returns the number of rows of the source or None if unknown."""
+        return self._total
+
+    def cacheStats(self):
+        """Returns a dict with the hits and misses of the page cache."""
+        return self.pages.stats()
+
+    def readPage(self, start):
+        """Reads a page of rows starting with row start from the source."""
+        count = self.pagesize
+        if self._total is not None:
+            count = min(count, self._total - start)
+        if count <= 0:
+            return []
+        if self._pagesource is not None:
+            return list(self._pagesource(start, count))
+        return list(itertools.islice(self._iterator, count))
+
+    def page(self, number):
+        """Returns the rows of a fetched page or None if they are gone."""
+        rows = self.pages.get(number)
+        if rows is None and self._pagesource is not None:
+            rows = self.readPage(number * self.pagesize)
+            self.pages.put(number, rows)
+        return rows
+
+    def canFetchMore(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return False
+        return self._total is None or self._fetched < self._total
+
+    def fetchMore(self, parent=QtCore.QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        start = self._fetched
+        rows = self.readPage(start)
+        if len(rows) < self.pagesize:
+            self._total = start + len(rows)  # the source is exhausted
+        if not rows:
+            return
+        self.pages.put(start // self.pagesize, rows)
+        self.beginInsertRows(QtCore.QModelIndex(), start,
+                             start + len(rows) - 1)
+        self._fetched += len(rows)
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role not in (Qt.DisplayRole, Qt.EditRole):
+            return QtCore.QVariant()
+        row, column = self.createKey(index)
+        if not 0 <= row < self._fetched:
+            return QtCore.QVariant()
+        number, offset = divmod(row, self.pagesize)
+        rows = self.page(number)
+        try:
+            value = rows[offset][column]
+        except (TypeError, IndexError):
+            # the page is gone or the row is too short
+            return QtCore.QVariant()
+        if value is None:
+            return QtCore.QVariant()
+        return value
+
+    def flags(self, index):
+        row, column = self.createKey(index)
+        if (0 <= row < self._fetched and
+            0 <= column < self.columnCount()):
+            return self.default_flags
+        return Qt.NoItemFlags
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self._refuseRowMap()
+
+    def setColumnFilter(self, column, predicate):
+        self._refuseRowMap()
+
+    def clearColumnFilter(self):
+        pass  # there never is a filter
+
+    def _refuseRowMap(self):
+        log.error("%s can not be sorted or filtered, that needs all rows",
+                  type(self).__name__)
+
+
+class QTableModelLoader(QtCore.QObject):
+    """Populates a table model from an iterable of rows on a worker thread.
+
+    The rows are read, and converted with convert if it is given, by a
+    QTableRowReader on the global QThreadPool. Batches of rows are queued
+    to the GUI thread and appended with model.appendRows, so the view
+    fills progressively while the GUI stays responsive.
+    """
+    progress = QtCore.pyqtSignal(int, int)  # rows appended, total or -1
+    finished = QtCore.pyqtSignal(bool)  # True if loading was cancelled
+    failed = QtCore.pyqtSignal(object)  # the exception raised while reading
+    # emitted by the reader in the worker thread
+    rowsRead = QtCore.pyqtSignal(object)  # a list of rows
+    readingDone = QtCore.pyqtSignal(object)  # an exception or None
+
+    def __init__(self, model, rows, batchsize=1000, totalrows=None,
+                 convert=None, parent=None):
+        QtCore.QObject.__init__(self, parent=parent)
+        self.model = model
+        self.rows = rows
+        self.batchsize = batchsize
+        self.totalrows = totalrows  # None if unknown
+        self.convert = convert
+        self._reader = None
+        self._appended = 0
+        self._cancelled = False
+        self.rowsRead.connect(self._appendRows, Qt.QueuedConnection)
+        self.readingDone.connect(self._readingDone, Qt.QueuedConnection)
+
+    def start(self):
+        """Starts reading rows in a worker thread."""
+        if self._reader is not None:
+            raise RuntimeError("The loader is already running")
+        self._appended = 0
+        self._cancelled = False
+        self._reader = QTableRowReader(self)
+        QtCore.QThreadPool.globalInstance().start(self._reader)
+
+    def cancel(self):
+        """Stops reading rows; batches that were not appended are dropped.
+
+        finished is emitted once the worker has stopped.
+        """
+        if self._reader is None:
+            return
+        self._cancelled = True
+        pool = QtCore.QThreadPool.globalInstance()
+        try:
+            taken = pool.tryTake(self._reader)
+        except RuntimeError:
+            # the pool deletes readers after running them, this one has
+            # finished and its readingDone is still queued
+            taken = False
+        if taken:
+            # the reader never ran, so it will not report back
+            self._reader = None
+            self.finished.emit(True)
+
+    def cancelled(self):
+        return self._cancelled
+
+    def isRunning(self):
+        return self._reader is not None
+
+    def appendedRows(self):
+        """Returns the number of rows appended to the model so far."""
+        return self._appended
+
+    def _appendRows(self, rows):
+        if self._cancelled:
+            return
+        self.model.appendRows(rows)
+        self._appended += len(rows)
+        total = -1 if self.totalrows is None else self.totalrows
+        self.progress.emit(self._appended, total)
+
+    def _readingDone(self, error):
+        self._reader = None
+        if error is not None:
+            self.failed.emit(error)
+        self.finished.emit(self._cancelled)
+
+
+class QTableRowReader(QtCore.QRunnable):
+    """Reads the rows of a QTableModelLoader in batches on a worker.
+
+    The batches are emitted with loader.rowsRead; the rows are only read
+    and converted here, the model is changed in the GUI thread.
+    """
+    def __init__(self, loader):
+        QtCore.QRunnable.__init__(self)
+        self.loader = loader
+
+    def run(self):
+        loader = self.loader
+        convert = loader.convert
+        error = None
+        batch = []
+        try:
+            for row in loader.rows:
+                if loader.cancelled():
+                    break
+                if convert is not None:
+                    row = convert(row)
+                batch.append(row)
+                if len(batch) >= loader.batchsize:
+                    loader.rowsRead.emit(batch)
+                    batch = []
+        except Exception as err:  # reported with loader.failed
+            error = err
+        if batch and not loader.cancelled():
+            loader.rowsRead.emit(batch)
+        loader.readingDone.emit(error)
+
+
+class LRUCache(object):
+    """A mapping that discards the least recently used entries.
+
+    At most maxcount entries are kept, None means no limit. If maxbytes is
+    given, sizeof is called with each value to determine its size in bytes
+    and entries are evicted until their total fits into maxbytes. The most
+    recently stored entry is always kept, even if it is bigger than that.
+    Lookups with get are counted as hits or misses, so the cache size can
+    be tuned.
+    """
+    def __init__(self, maxcount=16, maxbytes=None, sizeof=None):
+        if maxbytes is not None and sizeof is None:
+            raise ValueError("a byte limit requires a sizeof function")
+        self._entries = collections.OrderedDict()
+        self._sizes = {}  # maps keys to the size of their values in bytes
+        self._maxcount = maxcount
+        self._maxbytes = maxbytes
+        self._sizeof = sizeof
+        self._nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def maxCount(self):
+        """The maximum number of entries in this cache."""
+        return self._maxcount
+
+    def setMaxCount(self, val):
+        if val is not None and val < 1:
+            raise ValueError("maximum count must be bigger than 0")
+        self._maxcount = val
+        self.trim()
+
+    def maxBytes(self):
+        """The maximum total size of the entries in bytes."""
+        return self._maxbytes
+
+    def setMaxBytes(self, val):
+        if val is not None and self._sizeof is None:
+            raise ValueError("a byte limit requires a sizeof function")
+        self._maxbytes = val
+        self.trim()
+
+    def nbytes(self):
+        """Returns the total size of the entries in bytes."""
+        return self._nbytes
+
+    def get(self, key, default=None):
+        """Returns the value for key and marks it as recently used."""
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """Stores value for key and evicts the least recently used entries."""
+        if key in self._entries:
+            self.pop(key)
+        self._entries[key] = value
+        if self._sizeof is not None:
+            size = self._sizeof(value)
+            self._sizes[key] = size
+            self._nbytes += size
+        self.trim()
+
+    def pop(self, key, default=None):
+        """Removes key from the cache and returns its value."""
+        self._nbytes -= self._sizes.pop(key, 0)
+        return self._entries.pop(key, default)
+
+    def clear(self):
+        """Removes all entries, the statistics are kept."""
+        self._entries.clear()
+        self._sizes.clear()
+        self._nbytes = 0
+
+    def trim(self):
+        """Evicts the least recently used entries until the cache fits."""
+        maxcount = self._maxcount
+        while maxcount is not None and len(self._entries) > maxcount:
+            self.pop(next(iter(self._entries)))
+        maxbytes = self._maxbytes
+        while (maxbytes is not None and self._nbytes > maxbytes and
+               len(self._entries) > 1):
+            self.pop(next(iter(self._entries)))
+
+    def stats(self):
+        """Returns a dict with the hits, misses, count and bytes of this
+        cache."""
+        return {"hits": self.hits, "misses": self.misses,
+                "count": len(self._entries), "bytes": self._nbytes}
+
+    def resetStats(self):
+        self.hits = 0
+        self.misses = 0
+
+
 # --------------------------------------------------------------------------- #
 # Define functions
 # --------------------------------------------------------------------------- #
@@ -702,6 +3390,39 @@ def clearLayout(layout):
         widget.setParent(None)
 
 
+def cellRectangles(cells):
+    """Merges (row, column) cells into few (top, left, bottom, right)
+    rectangles, which cover exactly the cells.
+
+    Adjacent cells of a row become a run, runs with the same columns in
+    consecutive rows become a rectangle.
+    """
+    runsbyrow = {}
+    for row, column in sorted(cells):
+        runs = runsbyrow.setdefault(row, [])
+        if runs and runs[-1][1] == column - 1:
+            runs[-1][1] = column
+        else:
+            runs.append([column, column])
+    rectangles = []
+    current = {}  # maps (left, right) to the top and bottom of open rects
+    for row in sorted(runsbyrow):
+        runs = set((left, right) for left, right in runsbyrow[row])
+        merged = {}
+        for run, (top, bottom) in current.items():
+            if run in runs and bottom == row - 1:
+                merged[run] = (top, row)
+            else:
+                rectangles.append((top, run[0], bottom, run[1]))
+        for run in runs:
+            if run not in merged:
+                merged[run] = (row, row)
+        current = merged
+    for run, (top, bottom) in current.items():
+        rectangles.append((top, run[0], bottom, run[1]))
+    return rectangles
+
+
 def calculateScale(scalingrect, framingrect):
     """Return the scaling factor and the limiting dimension.
 
@@ -724,6 +3445,28 @@ def calculateScale(scalingrect, framingrect):
     return (hratio, "height")
 
 
+def visibleRect(widget):
+    """Returns the part of widget that is not clipped by its ancestors.
+
+    The rect is in local widget coordinates. Unlike QWidget.visibleRegion
+    this works for hidden widgets and ignores overlapping siblings.
+    """
+    rect = widget.rect()
+    parent = widget.parentWidget()
+    while parent is not None and not widget.isWindow():
+        origin = widget.mapFrom(parent, QtCore.QPoint(0, 0))
+        rect = rect.intersected(QtCore.QRect(origin, parent.size()))
+        if parent.isWindow():
+            break
+        parent = parent.parentWidget()
+    return rect
+
+
+def pixmapBytes(pixmap):
+    """Returns the approximate memory in bytes used by a QPixmap or QImage."""
+    return pixmap.width() * pixmap.height() * pixmap.depth() // 8
+
+
 def getCoords(obj):
     """Takes a position, size or rect and returns a tuple.
 
@@ -756,3 +3499,5 @@ def getCoords(obj):
 # Declare module globals
 # --------------------------------------------------------------------------- #
 log = logging.getLogger(__name__)
+# rendered QIconPushButton icons, shared by all buttons
+iconcache = LRUCache(None, 16 * 1024 * 1024, pixmapBytes)
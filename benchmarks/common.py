@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""Helpers shared by the benchmarks.
+
+Importing this module selects the offscreen Qt platform, unless
+QT_QPA_PLATFORM is already set, so the benchmarks run headless.
+"""
+
+# --------------------------------------------------------------------------- #
+# Import libraries
+# --------------------------------------------------------------------------- #
+import gc
+import importlib
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5 import QtWidgets
+
+
+# --------------------------------------------------------------------------- #
+# Define functions
+# --------------------------------------------------------------------------- #
+def importPackage():
+    """Imports the package from the folder above this one."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parent = os.path.dirname(root)
+    if parent not in sys.path:
+        sys.path.insert(0, parent)
+    return importlib.import_module(os.path.basename(root))
+
+
+def application():
+    """Returns the QApplication, which is created on the first call."""
+    global app
+    if app is None:
+        app = QtWidgets.QApplication.instance()
+    if app is None:
+        app = QtWidgets.QApplication([])
+    return app
+
+
+def measure(name, func, params=None, number=1, repeat=5, setup=None):
+    """Times func and returns a result dict.
+
+    func is called number times per run and the runs are repeated repeat
+    times. setup is called before each run. Times are in seconds per call.
+    """
+    times = []
+    for i in range(repeat):
+        if setup is not None:
+            setup()
+        gc.collect()
+        start = time.perf_counter()
+        for j in range(number):
+            func()
+        times.append((time.perf_counter() - start) / number)
+    return {"name": name, "params": params or {}, "number": number,
+            "repeat": repeat, "min": min(times),
+            "median": statistics.median(times),
+            "mean": statistics.mean(times)}
+
+
+def resultKey(result):
+    """Returns a string that identifies a benchmark and its parameters."""
+    params = ",".join("%s=%s" % item for item in sorted(
+        result["params"].items()))
+    return "%s[%s]" % (result["name"], params)
+
+
+# --------------------------------------------------------------------------- #
+# Declare module globals
+# --------------------------------------------------------------------------- #
+app = None  # keeps the QApplication alive, see application
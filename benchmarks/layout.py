@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks of QScalingLayout.setGeometry and sizeHint."""
+
+# --------------------------------------------------------------------------- #
+# Import libraries
+# --------------------------------------------------------------------------- #
+import itertools
+
+from PyQt5 import QtWidgets, QtCore
+
+import common
+
+
+# --------------------------------------------------------------------------- #
+# Define functions
+# --------------------------------------------------------------------------- #
+def createLayout(package, count):
+    """Returns a shown widget with a QScalingLayout of count widgets."""
+    widget = QtWidgets.QWidget()
+    layout = package.QScalingLayout(1000, 1000)
+    widget.setLayout(layout)
+    columns = max(1, int(count ** 0.5))
+    size = max(1, 1000 // columns)
+    for i in range(count):
+        row, column = divmod(i, columns)
+        child = QtWidgets.QWidget(widget)
+        child.setGeometry(column * size, row * size, size, size)
+        layout.addWidget(child)
+    widget.resize(800, 600)
+    widget.show()
+    common.application().processEvents()
+    return widget
+
+
+def run(package, quick=False):
+    common.application()
+    counts = (10, 100, 1000) if quick else (10, 100, 1000, 10000)
+    results = []
+    for count in counts:
+        widget = createLayout(package, count)
+        layout = widget.layout()
+        # alternate between two sizes, so every call is a full pass
+        rects = itertools.cycle([QtCore.QRect(0, 0, 800, 600),
+                                 QtCore.QRect(0, 0, 640, 480)])
+        number = max(1, 1000 // count)
+        results.append(common.measure(
+            "layout.setGeometry", lambda: layout.setGeometry(next(rects)),
+            {"items": count}, number=number))
+        results.append(common.measure(
+            "layout.sizeHint", layout.sizeHint, {"items": count},
+            number=number))
+        widget.close()
+        widget.deleteLater()
+    return results
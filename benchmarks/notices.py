@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks of keyboard nudging of notices on a QScalingNoticeBoard."""
+
+# --------------------------------------------------------------------------- #
+# Import libraries
+# --------------------------------------------------------------------------- #
+from PyQt5 import QtWidgets, QtGui, QtCore
+from PyQt5.QtCore import Qt
+
+import common
+
+
+# --------------------------------------------------------------------------- #
+# Define functions
+# --------------------------------------------------------------------------- #
+def createBoard(package, count):
+    """Returns a shown board with count label notices."""
+    board = package.QScalingNoticeBoard(1000, 1000)
+    columns = max(1, int(count ** 0.5))
+    size = max(1, 1000 // columns)
+    widgets = []
+    for i in range(count):
+        row, column = divmod(i, columns)
+        label = QtWidgets.QLabel(str(i))
+        label.setGeometry(column * size, row * size, size, size)
+        widgets.append(label)
+    notices = board.addNotices(widgets)
+    board.resize(800, 600)
+    board.show()
+    common.application().processEvents()
+    return board, notices
+
+
+def nudge(notice, presses, modifiers=Qt.ShiftModifier):
+    """Sends presses arrow key events to notice and applies them."""
+    app = common.application()
+    for i in range(presses):
+        key = Qt.Key_Right if i % 2 == 0 else Qt.Key_Down
+        event = QtGui.QKeyEvent(QtCore.QEvent.KeyPress, key, modifiers)
+        app.sendEvent(notice, event)
+    notice.applyPendingNudge()
+    app.processEvents()
+
+
+def run(package, quick=False):
+    common.application()
+    counts = (10, 1000) if quick else (10, 1000, 5000)
+    results = []
+    for count in counts:
+        board, notices = createBoard(package, count)
+        notice = notices[0]
+        for presses in (1, 20):
+            results.append(common.measure(
+                "notice.nudge", lambda: nudge(notice, presses),
+                {"notices": count, "presses": presses}, number=10))
+        board.close()
+        board.deleteLater()
+    return results
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks of QPixmapLabel scaling, resizing and painting."""
+
+# --------------------------------------------------------------------------- #
+# Import libraries
+# --------------------------------------------------------------------------- #
+import itertools
+
+from PyQt5 import QtGui, QtCore
+
+import common
+
+
+# --------------------------------------------------------------------------- #
+# Define functions
+# --------------------------------------------------------------------------- #
+def createPixmap(size):
+    """Returns a square pixmap with a gradient, so scaling does real work."""
+    pixmap = QtGui.QPixmap(size, size)
+    gradient = QtGui.QLinearGradient(0, 0, size, size)
+    gradient.setColorAt(0, QtGui.QColor("navy"))
+    gradient.setColorAt(1, QtGui.QColor("orange"))
+    painter = QtGui.QPainter(pixmap)
+    painter.fillRect(pixmap.rect(), gradient)
+    painter.end()
+    return pixmap
+
+
+def run(package, quick=False):
+    common.application()
+    sizes = (256, 1024) if quick else (256, 1024, 4096)
+    results = []
+    rect = QtCore.QRect(0, 0, 300, 200)
+    for size in sizes:
+        pixmap = createPixmap(size)
+        params = {"source": size}
+        results.append(common.measure(
+            "pixmap.fitPixmapIntoRect",
+            lambda: package.QPixmapLabel.fitPixmapIntoRect(rect, pixmap),
+            params, number=10))
+        label = package.QPixmapLabel()
+        label.setPixmap(pixmap)
+        label.resize(300, 200)
+        label.show()
+        # more sizes than the label caches, so each resize rescales
+        widths = itertools.cycle(range(300, 340))
+        results.append(common.measure(
+            "pixmap.resizeEvent",
+            lambda: label.resize(next(widths), 200), params, number=10))
+        # render into a pixmap, offscreen windows are not always exposed
+        target = QtGui.QPixmap(400, 200)
+        results.append(common.measure(
+            "pixmap.paintEvent", lambda: label.render(target), params,
+            number=10))
+
+        def resizeAndPaint():
+            label.resize(next(widths), 200)
+            label.render(target)
+        results.append(common.measure(
+            "pixmap.resizeAndPaint", resizeAndPaint, params, number=10))
+        label.close()
+        label.deleteLater()
+    return results
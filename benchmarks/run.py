@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""Runs the benchmarks, writes the results as JSON and compares them.
+
+Examples:
+    python benchmarks/run.py --output baseline.json
+    python benchmarks/run.py --baseline baseline.json --output current.json
+
+Without --output the JSON report goes to stdout. With a baseline, the
+comparison is printed to stderr, benchmarks whose median time grew by more
+than the threshold are reported and the exit status is 1.
+"""
+
+# --------------------------------------------------------------------------- #
+# Import libraries
+# --------------------------------------------------------------------------- #
+import argparse
+import importlib
+import json
+import platform
+import sys
+
+from PyQt5 import QtCore
+
+import common
+
+MODULES = ["layout", "notices", "pixmaps", "tables"]
+
+
+# --------------------------------------------------------------------------- #
+# Define functions
+# --------------------------------------------------------------------------- #
+def runBenchmarks(names, quick=False):
+    """Runs the benchmark modules and returns the list of results."""
+    package = common.importPackage()
+    results = []
+    for name in names:
+        module = importlib.import_module(name)
+        print("running %s" % name, file=sys.stderr)
+        results.extend(module.run(package, quick))
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Prints the results next to the baseline to stderr and returns the
+    keys of the regressions."""
+    before = {common.resultKey(result): result
+              for result in baseline["results"]}
+    regressions = []
+    print("%-64s %11s %11s %7s" % ("benchmark", "baseline", "current",
+                                   "ratio"), file=sys.stderr)
+    for result in results:
+        key = common.resultKey(result)
+        if key not in before:
+            print("%-64s %11s %11.6f %7s" % (key, "-", result["median"], "-"),
+                  file=sys.stderr)
+            continue
+        old = before[key]["median"]
+        ratio = result["median"] / old if old > 0 else float("inf")
+        flag = ""
+        if ratio > threshold:
+            flag = " !"
+            regressions.append(key)
+        print("%-64s %11.6f %11.6f %6.2fx%s" % (key, old, result["median"],
+                                                ratio, flag),
+              file=sys.stderr)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("modules", nargs="*", default=MODULES,
+                        help="benchmark modules to run (default: all)")
+    parser.add_argument("--quick", action="store_true",
+                        help="use smaller problem sizes")
+    parser.add_argument("--output", help="write the results to this file")
+    parser.add_argument("--baseline", help="compare with this result file")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="slowdown ratio reported as regression")
+    args = parser.parse_args(argv)
+    for name in args.modules:
+        if name not in MODULES:
+            parser.error("unknown benchmark module: %s" % name)
+
+    results = runBenchmarks(args.modules, args.quick)
+    report = {"python": platform.python_version(),
+              "qt": QtCore.QT_VERSION_STR,
+              "pyqt": QtCore.PYQT_VERSION_STR,
+              "platform": platform.platform(),
+              "quick": args.quick,
+              "results": results}
+    if args.output:
+        with open(args.output, "w") as fileobj:
+            json.dump(report, fileobj, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    if args.baseline:
+        with open(args.baseline) as fileobj:
+            baseline = json.load(fileobj)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print("%s regression(s) above %.2fx" % (len(regressions),
+                                                    args.threshold),
+                  file=sys.stderr)
+            return 1
+    return 0
+
+
+# --------------------------------------------------------------------------- #
+# Start benchmarks
+# --------------------------------------------------------------------------- #
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""Compares the memory use of QTableItem with the former dict based item.
+
+Run it from anywhere with: python benchmarks/table_items.py [--cells N]
+"""
+
+# --------------------------------------------------------------------------- #
+# Import libraries
+# --------------------------------------------------------------------------- #
+import argparse
+import gc
+import tracemalloc
+
+from PyQt5 import QtCore
+from PyQt5.QtCore import Qt
+
+import common
+
+
+# --------------------------------------------------------------------------- #
+# Define classes
+# --------------------------------------------------------------------------- #
+class LegacyTableItem(object):
+    """QTableItem as it was before it used slots, for comparison."""
+    default_flags = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+    def __init__(self, datamap=None, flags=None):
+        if datamap is None:
+            self.datamap = {Qt.DisplayRole: ""}  # maps roles to values
+        else:
+            self.datamap = datamap
+        if flags is None:
+            self.flags = self.default_flags
+        else:
+            self.flags = flags
+
+    def data(self, role=Qt.DisplayRole):
+        return self.datamap.get(role, QtCore.QVariant())
+
+    def setData(self, value, role=Qt.DisplayRole):
+        self.datamap[role] = value
+
+
+# --------------------------------------------------------------------------- #
+# Define functions
+# --------------------------------------------------------------------------- #
+def measure(create, count):
+    """Returns the bytes allocated by count items made by create."""
+    gc.collect()
+    tracemalloc.start()
+    items = [create(i) for i in range(count)]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del items
+    return size
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cells", type=int, default=200000,
+                        help="number of items to create")
+    args = parser.parse_args(argv)
+    QTableItem = common.importPackage().QTableItem
+
+    def displayOnly(cls):
+        return lambda i: cls({Qt.DisplayRole: i})
+
+    def withToolTip(cls):
+        def create(i):
+            item = cls({Qt.DisplayRole: i})
+            item.setData("tip", Qt.ToolTipRole)
+            return item
+        return create
+
+    cases = [("display only", displayOnly), ("display and tooltip",
+                                             withToolTip)]
+    print("%-22s %14s %14s %8s" % ("case", "legacy B/item", "slots B/item",
+                                    "ratio"))
+    for name, factory in cases:
+        legacy = measure(factory(LegacyTableItem), args.cells) / args.cells
+        compact = measure(factory(QTableItem), args.cells) / args.cells
+        print("%-22s %14.1f %14.1f %7.1fx" % (name, legacy, compact,
+                                              legacy / compact))
+
+
+# --------------------------------------------------------------------------- #
+# Start benchmark
+# --------------------------------------------------------------------------- #
+if __name__ == "__main__":
+    main()
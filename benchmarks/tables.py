@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks of table model data and flags scans and setData bursts."""
+
+# --------------------------------------------------------------------------- #
+# Import libraries
+# --------------------------------------------------------------------------- #
+from PyQt5.QtCore import Qt
+
+import common
+
+COLUMNS = 20
+
+
+# --------------------------------------------------------------------------- #
+# Define functions
+# --------------------------------------------------------------------------- #
+def createModel(cls, rows):
+    """Returns a model of cls with rows rows of numbers."""
+    model = cls(["c%d" % column for column in range(COLUMNS)])
+    model.appendRows([[row * COLUMNS + column for column in range(COLUMNS)]
+                      for row in range(rows)])
+    return model
+
+
+def indexes(model):
+    """Returns the indexes of all cells of model."""
+    return [model.index(row, column)
+            for row in range(model.rowCount())
+            for column in range(model.columnCount())]
+
+
+def run(package, quick=False):
+    common.application()
+    rowcounts = (1000,) if quick else (1000, 10000)
+    results = []
+    models = [("QTableModel", package.QTableModel),
+              ("QColumnarTableModel", package.QColumnarTableModel)]
+    for rows in rowcounts:
+        for name, cls in models:
+            model = createModel(cls, rows)
+            cells = indexes(model)
+            params = {"model": name, "rows": rows}
+            data = model.data
+            flags = model.flags
+            results.append(common.measure(
+                "table.dataScan", lambda: [data(index) for index in cells],
+                params))
+            results.append(common.measure(
+                "table.flagsScan", lambda: [flags(index) for index in cells],
+                params))
+        model = createModel(package.QEditableTableModel, rows)
+        cells = indexes(model)[:1000]
+        params = {"model": "QEditableTableModel", "rows": rows,
+                  "cells": len(cells)}
+
+        def setDataBurst():
+            for index in cells:
+                model.setData(index, 1, Qt.DisplayRole)
+        results.append(common.measure(
+            "table.setDataBurst", setDataBurst, params))
+        values = {(index.row(), index.column()): 1 for index in cells}
+        results.append(common.measure(
+            "table.setDataBulk",
+            lambda: model.setDataBulk(values, Qt.DisplayRole), params))
+    return results